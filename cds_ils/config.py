@@ -213,10 +213,9 @@ CELERY_BEAT_SCHEDULE = {
         "task": "cds_ils.ldap.tasks.synchronize_users_task",
         "schedule": crontab(minute=0, hour=4),  # every day, 4am
     },
-    "clean_importer_preview_logs": {
-        "task": "cds_ils.importer.tasks.clean_preview_logs",
-        "schedule": crontab(day_of_week="mon", minute=0, hour=6),
-        # every Monday, 6am
+    "prune_importer_logs": {
+        "task": "cds_ils.importer.tasks.prune_import_logs_task",
+        "schedule": crontab(minute=0, hour=6),  # every day, 6am
     },
 }
 
@@ -709,6 +708,8 @@ CDS_ILS_DOI_URL_PREFIX = "http://dx.doi.org/{doi}"
 ###############################################################################
 
 CDS_ILS_IMPORTER_RECORD_TAG = "//*[local-name() = 'record']"
+#: Record tag matched by the streaming parser, in any namespace
+CDS_ILS_IMPORTER_STREAM_RECORD_TAG = "{*}record"
 
 CDS_ILS_IMPORTER_PROVIDERS = {
     "cds": {
@@ -780,6 +781,120 @@ CDS_ILS_IMPORTER_PROVIDERS = {
     "safari": {"priority": 4, "agency_code": "OCoLC"},
 }
 
+#: Number of processes translating records to JSON during an import,
+#: records are translated by the importing process when set to 0
+CDS_ILS_IMPORTER_TRANSLATION_WORKERS = 0
+#: Number of records sent at once to a translation process
+CDS_ILS_IMPORTER_TRANSLATION_CHUNK_SIZE = 50
+
+#: Number of records committed together during an import, each record is
+#: imported in its own savepoint and rolled back alone on errors
+CDS_ILS_IMPORTER_TRANSACTION_BATCH_SIZE = 1
+
+#: Number of record log entries inserted together during an import, the
+#: buffered entries are also inserted with each batch of committed records
+CDS_ILS_IMPORTER_RECORD_LOG_BUFFER_SIZE = 1
+#: Maximum number of seconds a record log entry is kept in the buffer
+CDS_ILS_IMPORTER_RECORD_LOG_BUFFER_DELAY = 5
+
+#: Number of imported records indexed together in bulk, records are indexed
+#: one by one right after their import when set to 0
+CDS_ILS_IMPORTER_INDEXING_CHUNK_SIZE = 0
+
+#: Number of records whose matching documents are searched together in a
+#: single multi search request, records are matched one by one when set to 0
+CDS_ILS_IMPORTER_MATCHING_CHUNK_SIZE = 0
+
+#: Number of translated records whose vocabulary values stored in the search
+#: engine are searched together, before the records are validated one by one
+CDS_ILS_IMPORTER_VOCABULARIES_CHUNK_SIZE = 0
+
+#: Maximum number of hits fetched per matching search in a multi search,
+#: searches with more hits are run again on their own
+CDS_ILS_IMPORTER_MATCHING_MAX_HITS = 100
+
+#: Load the ISBN, DOI and standard number identifiers of all the documents
+#: in memory once per import, to match them without searching
+CDS_ILS_IMPORTER_PRELOAD_IDENTIFIERS_INDEX = False
+
+#: Skip the records whose translated JSON did not change since their last
+#: import by the same provider, when their document still exists. They are
+#: reported with the ``unchanged`` action.
+CDS_ILS_IMPORTER_SKIP_UNCHANGED = False
+
+#: Lock the identifiers, title and authors of each imported record while it
+#: is matched and imported, so that concurrent imports of the same record
+#: do not create duplicates. Locked imports commit and index each record on
+#: its own, without preloaded identifiers or prefetched matches. PostgreSQL
+#: only.
+CDS_ILS_IMPORTER_MATCHING_LOCKS = False
+
+#: Number of records imported by each task when an uploaded file is split
+#: across the workers, the whole file is imported by a single task when set
+#: to 0. The records sharing identifiers are imported one after the other.
+CDS_ILS_IMPORTER_TASK_CHUNK_SIZE = 0
+
+#: Number of processed entries between two checkpoints of an import, an
+#: interrupted import is resumed from its last checkpoint
+CDS_ILS_IMPORTER_CHECKPOINT_INTERVAL = 1000
+#: Hours without a checkpoint after which a running import whose celery task
+#: is not known to be done is considered interrupted, and can be resumed
+CDS_ILS_IMPORTER_STALE_HOURS = 6
+
+#: Profile the translation rules during an import, records are translated by
+#: the importing process and a report of the slowest rules is logged at the end
+CDS_ILS_IMPORTER_RULES_PROFILE = False
+#: Store the translation rules profile report in the import log
+CDS_ILS_IMPORTER_RULES_PROFILE_ATTACH = False
+
+#: Store the report columns of each entry log compressed together in one
+#: binary column, with the document JSON as a diff against the imported JSON.
+#: Only the entry logs created with the option enabled are compacted.
+CDS_ILS_IMPORTER_COMPACT_REPORTS = False
+
+#: Number of the documents loaded to validate the matches kept in a least
+#: recently used cache along an import, 0 to disable. Not used with
+#: matching locks, the documents being imported concurrently.
+CDS_ILS_IMPORTER_DOCUMENTS_CACHE_SIZE = 0
+
+#: Maximum number of the best scored similar documents reported as partial
+#: matches of each imported record, 0 to report all of them
+CDS_ILS_IMPORTER_FUZZY_MATCH_MAX_HITS = 10
+#: Minimum score of the similar documents found by the search engine,
+#: 0 to report any hit
+CDS_ILS_IMPORTER_FUZZY_MATCH_MIN_SCORE = 0
+#: Engine finding the documents similar to the imported records: ``search``
+#: for the search engine, ``local`` for a trigram index of the catalogue
+#: titles and authors loaded at the start of each import, or ``fallback`` for
+#: the search engine, falling back to the local index when it is unavailable
+CDS_ILS_IMPORTER_SIMILARITY_ENGINE = "search"
+#: Minimum trigram Jaccard similarity of the titles of the documents found
+#: similar by the local index
+CDS_ILS_IMPORTER_SIMILARITY_THRESHOLD = 0.6
+
+#: Reuse the translated JSON and the match decisions of a successful preview
+#: of the same file, provider and options run in the last hours when
+#: importing it, 0 to disable. The match decisions are revalidated first.
+CDS_ILS_IMPORTER_REUSE_PREVIEW_HOURS = 0
+
+#: Days the importer logs of each mode are kept, ``None`` to keep them forever
+CDS_ILS_IMPORTER_LOGS_RETENTION_DAYS = {
+    "PREVIEW_IMPORT": 7,
+    "PREVIEW_DELETE": 7,
+    "IMPORT": None,
+    "DELETE": None,
+}
+#: Number of entry logs deleted per statement when pruning the importer logs
+CDS_ILS_IMPORTER_LOGS_PRUNE_BATCH_SIZE = 5000
+#: JSON lines file the summaries of the pruned importer logs are appended to,
+#: ``None`` to not archive them
+CDS_ILS_IMPORTER_LOGS_ARCHIVE_PATH = None
+
+#: Number of entry logs returned per page by the importer details view
+CDS_ILS_IMPORTER_RECORDS_PAGE_SIZE = 100
+#: Maximum number of entry logs a client can request per page
+CDS_ILS_IMPORTER_RECORDS_MAX_PAGE_SIZE = 1000
+
 CDS_ILS_IMPORTER_UPLOADS_PATH = "/tmp"
 
 CDS_ILS_IMPORTER_FILE_EXTENSIONS_ALLOWED = [".xml"]
@@ -65,17 +65,15 @@ class XMLRecordToJson(object):
             )
         else:
             raise UnrecognisedImportMediaType(leader_tag)
-        # MARCXML -> JSON fields translation
+        # MARCXML -> JSON fields translation, collecting the missing rules
+        missing = None if self.ignore_missing else set()
         val = self.dojson_model.do(
             marc_record,
             exception_handlers=xml_import_handlers,
             init_fields=init_fields,
+            missing=missing,
         )
 
-        if not self.ignore_missing:
-            # check for missing rules
-            missing = self.dojson_model.missing(marc_record)
-
-            if missing:
-                raise LossyConversion(missing=missing)
+        if missing:
+            raise LossyConversion(missing=missing)
         return dt, val, is_deletable
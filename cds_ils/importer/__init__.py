@@ -7,6 +7,7 @@
 
 """CDS-IlS Importer module."""
 
+import importlib_metadata
 from cds_dojson.matcher import matcher
 from cds_dojson.overdo import OverdoBase
 from dojson.contrib.marc21 import model as default_model
@@ -23,7 +24,15 @@ class CDSOverdoBase(OverdoBase):
 
         if model == default_model:
             raise RecordModelMissing
-        return matcher(blob, self.entry_point_models).do(blob, **kwargs)
+        return model.do(blob, **kwargs)
+
+    def build(self):
+        """Build the rules of all the models, if not built yet."""
+        entry_points = importlib_metadata.entry_points(group=self.entry_point_models)
+        for entry_point in entry_points:
+            model = entry_point.load()
+            if model.index is None:
+                model.build()
 
 
 marc21 = CDSOverdoBase(entry_point_models="cds_ils.importer.models")
@@ -7,16 +7,66 @@
 
 """CDS-ILS Importer API module."""
 
+import multiprocessing
 import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, closing
+from itertools import islice
 
 from flask import current_app
 from invenio_db import db
+from lxml import etree
 
-from cds_ils.importer.errors import ProviderNotAllowedDeletion
-from cds_ils.importer.handlers import get_importer_handler
-from cds_ils.importer.models import ImporterMode, ImporterTaskStatus, ImportRecordLog
-from cds_ils.importer.parse_xml import get_record_recid_from_xml, get_records_list
+from cds_ils.importer import marc21
+from cds_ils.importer.checkpoints import ImportCheckpoints
+from cds_ils.importer.documents.importer import (
+    VOCABULARIES_FIELDS as DOCUMENT_VOCABULARIES_FIELDS,
+)
+from cds_ils.importer.errors import (
+    ChunkedImportError,
+    ProviderNotAllowedDeletion,
+    UnknownProvider,
+)
+from cds_ils.importer.handlers import (
+    get_importer_handler,
+    importer_exception_handlers,
+    importing_chunk,
+)
+from cds_ils.importer.indexer import deferred_indexing, staged_indexing
+from cds_ils.importer.locks import is_locking, matching_locks
+from cds_ils.importer.matching import (
+    prefetch_document_matches,
+    preloaded_identifiers_index,
+)
+from cds_ils.importer.models import (
+    ImporterMode,
+    ImportRecordLog,
+    buffered_record_logs,
+    flush_record_logs,
+)
+from cds_ils.importer.parse_xml import (
+    ResumedXMLFile,
+    get_record_recid_from_xml,
+    iter_records,
+)
+from cds_ils.importer.previews import (
+    find_preview_reuse,
+    fingerprint_source,
+    importing_entry,
+    reusing_preview,
+)
+from cds_ils.importer.profiler import get_rule_profiler, profiling_rules
+from cds_ils.importer.records import cached_documents
+from cds_ils.importer.similarity import preloaded_similarity_index
+from cds_ils.importer.transaction import (
+    batched_transaction,
+    commit_batch,
+    is_batched,
+    record_savepoint,
+)
 from cds_ils.importer.vocabularies_validator import validator as vocabulary_validator
+from cds_ils.importer.vocabularies_validator import vocabulary_registry
 from cds_ils.importer.XMLRecordLoader import XMLRecordDumpLoader
 from cds_ils.importer.XMLRecordToJson import XMLRecordToJson
 
@@ -31,15 +81,23 @@ def create_json(data, source_type, ignore_missing_rules=False):
 
 def import_from_json(json_data, is_deletable, provider, mode):
     """Import from Json."""
-    try:
-        report = XMLRecordDumpLoader.import_from_json(
-            json_data, is_deletable, provider, mode
-        )
-        db.session.commit()
-        return report
-    except Exception as e:
-        db.session.rollback()
-        raise e
+    with staged_indexing():
+        if is_batched():
+            # only this record is rolled back on errors, the batch goes on
+            with record_savepoint():
+                return XMLRecordDumpLoader.import_from_json(
+                    json_data, is_deletable, provider, mode
+                )
+
+        try:
+            report = XMLRecordDumpLoader.import_from_json(
+                json_data, is_deletable, provider, mode
+            )
+            db.session.commit()
+            return report
+        except Exception as e:
+            db.session.rollback()
+            raise e
 
 
 def validate_import(provider, mode, source_type):
@@ -58,6 +116,259 @@ def validate_import(provider, mode, source_type):
         raise ProviderNotAllowedDeletion(provider=provider)
 
 
+def _translate_chunk(chunk, source_type, ignore_missing_rules):
+    """Translate a chunk of serialized xml records, collecting errors."""
+    results = []
+    for record_recid, data in chunk:
+        try:
+            json_data, is_deletable = create_json(
+                data, source_type, ignore_missing_rules=ignore_missing_rules
+            )
+            results.append((record_recid, json_data, is_deletable, None))
+        except Exception as exc:
+            results.append((record_recid, None, None, exc))
+    return results
+
+
+def _init_translation_worker(app):
+    """Push an application context in a translation process.
+
+    The connections of the pool inherited from the parent process are
+    dropped without being closed, they still belong to the parent.
+    """
+    app.app_context().push()
+    db.engine.dispose(close=False)
+
+
+def _translate_records_in_pool(
+    records, source_type, ignore_missing_rules, workers, chunk_size
+):
+    """Translate records in a process pool, keeping their order.
+
+    At most two chunks per process are pending at any time, so the reading
+    of the source file never runs far ahead of the importing consumer.
+    """
+    app = current_app._get_current_object()
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_translation_worker,
+        initargs=(app,),
+    )
+    pending = deque()
+    records = iter(records)
+    try:
+        while True:
+            while len(pending) < workers * 2:
+                chunk = [
+                    (get_record_recid_from_xml(record), etree.tostring(record))
+                    for record in islice(records, chunk_size)
+                ]
+                if not chunk:
+                    break
+                pending.append(
+                    executor.submit(
+                        _translate_chunk, chunk, source_type, ignore_missing_rules
+                    )
+                )
+            if not pending:
+                break
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def translate_records(records, source_type, ignore_missing_rules=False):
+    """Translate xml records to JSON.
+
+    Yields ``(record_recid, json_data, is_deletable, exception)`` tuples in
+    the order of the source. Translation runs in a pool of processes when
+    ``CDS_ILS_IMPORTER_TRANSLATION_WORKERS`` is set, otherwise lazily in
+    the current process, always when the translation rules are profiled.
+    """
+    # build the translation rules once, before forking the workers
+    marc21.build()
+
+    workers = current_app.config["CDS_ILS_IMPORTER_TRANSLATION_WORKERS"]
+    if workers and get_rule_profiler() is None:
+        chunk_size = current_app.config["CDS_ILS_IMPORTER_TRANSLATION_CHUNK_SIZE"]
+        yield from _translate_records_in_pool(
+            records, source_type, ignore_missing_rules, workers, chunk_size
+        )
+        return
+
+    for record in records:
+        record_recid = get_record_recid_from_xml(record)
+        yield from _translate_chunk(
+            [(record_recid, record)], source_type, ignore_missing_rules
+        )
+
+
+def translate_previewed_records(
+    records, source_type, preview_reuse, ignore_missing_rules=False
+):
+    """Translate xml records to JSON, reusing the JSON of their preview.
+
+    The records missing from the preview are translated in the current
+    process.
+    """
+    marc21.build()
+
+    for record in records:
+        record_recid = get_record_recid_from_xml(record)
+        json_data = preview_reuse.translated(record_recid)
+        if json_data:
+            # the deletion flag is only read when deleting records
+            yield record_recid, json_data, False, None
+        else:
+            yield from _translate_chunk(
+                [(record_recid, record)], source_type, ignore_missing_rules
+            )
+
+
+def import_translated_record(
+    log, record_recid, json_data, is_deletable, provider, mode
+):
+    """Import a translated record, logging the outcome."""
+    try:
+        with importing_entry(record_recid):
+            report = import_from_json(json_data, is_deletable, provider, mode)
+        ImportRecordLog.create_success(log.id, record_recid, report)
+    except Exception as exc:
+        handler = get_importer_handler(exc, log)
+        handler(exc, log.id, record_recid, json_data=json_data)
+
+
+def import_records(
+    log, translated_records, provider, mode, batch_size=1, checkpoints=None
+):
+    """Import translated records, committing every ``batch_size`` records.
+
+    The cancellation of the import is checked before each record. The
+    processed entries are counted when committed, so that the log row is
+    only locked by the commit.
+    """
+    start = checkpoints.start if checkpoints else 0
+    processed_count = 0
+    for index, (record_recid, json_data, is_deletable, exc) in enumerate(
+        translated_records, start=start + 1
+    ):
+        if log.is_cancel_requested():
+            break
+
+        if checkpoints and checkpoints.restore(record_recid):
+            # imported before the interruption of the import
+            pass
+        elif exc is not None:
+            # step 1 failed: the XML could not be translated
+            handler = get_importer_handler(exc, log)
+            handler(exc, log.id, record_recid)
+        else:
+            # step 2: import json
+            import_translated_record(
+                log, record_recid, json_data, is_deletable, provider, mode
+            )
+        processed_count += 1
+        is_checkpoint = checkpoints and checkpoints.is_due(index)
+        if index % batch_size == 0 or is_checkpoint:
+            log.increment_processed_count(processed_count)
+            processed_count = 0
+        if index % batch_size == 0:
+            # the logs of the batch are committed along its records
+            flush_record_logs()
+            commit_batch()
+        if checkpoints:
+            checkpoints.after(index)
+    if processed_count:
+        # committed with the last batch
+        log.increment_processed_count(processed_count)
+
+
+def prefetch_vocabularies(translated_records):
+    """Prefetch the vocabulary values of the translated records by chunk."""
+    chunk_size = current_app.config["CDS_ILS_IMPORTER_VOCABULARIES_CHUNK_SIZE"]
+    if not chunk_size:
+        yield from translated_records
+        return
+
+    while True:
+        chunk = list(islice(translated_records, chunk_size))
+        if not chunk:
+            return
+        vocabulary_validator.prefetch(
+            DOCUMENT_VOCABULARIES_FIELDS,
+            [json_data for _, json_data, _, exc in chunk if exc is None],
+        )
+        yield from chunk
+
+
+def get_batch_matching_importer_class(provider):
+    """Return the importer class if it matches documents by searching."""
+    try:
+        importer_class = XMLRecordDumpLoader.get_importer_class(provider)
+    except UnknownProvider:
+        # reported for each record when imported
+        return None
+    if importer_class.BATCH_MATCHING:
+        return importer_class
+
+
+def prefetch_matches(translated_records, provider):
+    """Prefetch the matching documents of the translated records by chunk."""
+    config = current_app.config
+    chunk_size = config["CDS_ILS_IMPORTER_MATCHING_CHUNK_SIZE"]
+    importer_class = get_batch_matching_importer_class(provider)
+
+    if not chunk_size or not importer_class or is_locking():
+        # the matches of the locked records are searched once locked
+        yield from translated_records
+        return
+
+    yield from prefetch_document_matches(
+        translated_records,
+        importer_class,
+        provider,
+        chunk_size,
+        config["CDS_ILS_IMPORTER_MATCHING_MAX_HITS"],
+    )
+
+
+def report_rules_profile(log, rule_profiler):
+    """Log the translation rules profile of an import."""
+    current_app.logger.info(
+        "Importer translation rules profile of import {0}:\n{1}".format(
+            log.id, rule_profiler.format_report()
+        )
+    )
+    if current_app.config["CDS_ILS_IMPORTER_RULES_PROFILE_ATTACH"]:
+        log.rules_profile = rule_profiler.report()
+        db.session.commit()
+
+
+def find_log_preview_reuse(
+    log, source_path, provider, mode, ignore_missing_rules, locking
+):
+    """Fingerprint the source of an import, returning its preview to reuse.
+
+    The results of a recent preview of the same source are reused when
+    importing, unless the matching keys are locked by concurrent imports.
+    """
+    max_age = current_app.config["CDS_ILS_IMPORTER_REUSE_PREVIEW_HOURS"]
+    if not max_age or mode not in (
+        ImporterMode.PREVIEW_IMPORT.value,
+        ImporterMode.IMPORT.value,
+    ):
+        return None
+
+    log.fingerprint = fingerprint_source(source_path, provider, ignore_missing_rules)
+    db.session.commit()
+    if mode != ImporterMode.IMPORT.value or locking:
+        return None
+    return find_preview_reuse(log.fingerprint, max_age)
+
+
 def import_from_xml(
     log,
     source_path,
@@ -66,51 +377,190 @@ def import_from_xml(
     mode,
     ignore_missing_rules=False,
     eager=False,
+    resume=False,
 ):
-    """Load a single xml file."""
+    """Load a single xml file.
+
+    When resumed, the import starts from the last checkpoint of the log and
+    skips the entries already logged.
+    """
+    rule_profiler, preview_reuse = None, None
     try:
         # reset vocabularies validator cache
         vocabulary_validator.reset()
+        # read the vocabularies files before importing the first record
+        vocabulary_registry.load()
         validate_import(provider, mode, source_type)
 
-        with open(source_path, "r") as source:
-            records_list = list(get_records_list(source))
-
-            # update the entries count now that we know it
-            log.set_entries_count(records_list)
-            for record in records_list:
-                if log.status == ImporterTaskStatus.CANCELLED:
-                    break
-
-                record_recid = get_record_recid_from_xml(record)
+        config = current_app.config
+        # pre-scan the file for the entries offsets, no tree is built
+        with open(source_path, "rb") as source:
+            checkpoints = ImportCheckpoints.scan(
+                log,
+                source,
+                config["CDS_ILS_IMPORTER_CHECKPOINT_INTERVAL"],
+                resume=resume,
+            )
+        if resume:
+            log.processed_count = checkpoints.start
+        log.set_entries_count(len(checkpoints))
 
-                # step 1: translate XML
-                try:
-                    json_data, is_deletable = create_json(
-                        record, source_type, ignore_missing_rules=ignore_missing_rules
-                    )
-                except Exception as exc:
-                    handler = get_importer_handler(exc, log)
-                    handler(exc, log.id, record_recid)
-                    continue
-
-                # step 2: import json
-                try:
-                    report = import_from_json(json_data, is_deletable, provider, mode)
-                    ImportRecordLog.create_success(log.id, record_recid, report)
-                except Exception as exc:
-                    handler = get_importer_handler(exc, log)
-                    handler(exc, log.id, record_recid, json_data=json_data)
-                    continue
+        batch_size = config["CDS_ILS_IMPORTER_TRANSACTION_BATCH_SIZE"]
+        indexing_chunk_size = config["CDS_ILS_IMPORTER_INDEXING_CHUNK_SIZE"]
+        locking = config["CDS_ILS_IMPORTER_MATCHING_LOCKS"]
+        if locking:
+            # the locks are released once the record is committed and indexed
+            batch_size, indexing_chunk_size = 1, 0
+        preview_reuse = find_log_preview_reuse(
+            log, source_path, provider, mode, ignore_missing_rules, locking
+        )
+        with ExitStack() as stack:
+            rule_profiler = stack.enter_context(
+                profiling_rules(config["CDS_ILS_IMPORTER_RULES_PROFILE"])
+            )
+            stack.enter_context(deferred_indexing(indexing_chunk_size))
+            stack.enter_context(
+                preloaded_identifiers_index(
+                    config["CDS_ILS_IMPORTER_PRELOAD_IDENTIFIERS_INDEX"]
+                    and get_batch_matching_importer_class(provider) is not None
+                    and not locking
+                )
+            )
+            stack.enter_context(
+                preloaded_similarity_index(
+                    config["CDS_ILS_IMPORTER_SIMILARITY_ENGINE"]
+                    in ("local", "fallback")
+                )
+            )
+            stack.enter_context(
+                cached_documents(
+                    0 if locking else config["CDS_ILS_IMPORTER_DOCUMENTS_CACHE_SIZE"]
+                )
+            )
+            stack.enter_context(matching_locks(locking))
+            stack.enter_context(reusing_preview(preview_reuse))
+            # commit the last batch and the buffered logs before indexing
+            stack.callback(commit_batch)
+            stack.enter_context(batched_transaction(batch_size, locked=locking))
+            stack.enter_context(
+                buffered_record_logs(
+                    config["CDS_ILS_IMPORTER_RECORD_LOG_BUFFER_SIZE"],
+                    config["CDS_ILS_IMPORTER_RECORD_LOG_BUFFER_DELAY"],
+                )
+            )
+            source = stack.enter_context(open(source_path, "rb"))
+            if checkpoints.start_offset is not None:
+                source = ResumedXMLFile(
+                    source, checkpoints.header_size, checkpoints.start_offset
+                )
+            if preview_reuse:
+                translated_records = translate_previewed_records(
+                    iter_records(source),
+                    source_type,
+                    preview_reuse,
+                    ignore_missing_rules,
+                )
+            else:
+                translated_records = translate_records(
+                    iter_records(source), source_type, ignore_missing_rules
+                )
+            translated_records = stack.enter_context(closing(translated_records))
+            translated_records = stack.enter_context(
+                closing(prefetch_vocabularies(translated_records))
+            )
+            if not (preview_reuse and preview_reuse.reuse_matches):
+                # the previewed matches are not searched again
+                translated_records = stack.enter_context(
+                    closing(prefetch_matches(translated_records, provider))
+                )
+            import_records(
+                log, translated_records, provider, mode, batch_size, checkpoints
+            )
 
     except Exception as exc:
         handler = get_importer_handler(exc, log)
         handler(exc, log.id, None)
         log.set_failed(exc)
 
+    if rule_profiler is not None:
+        report_rules_profile(log, rule_profiler)
+    if preview_reuse is not None:
+        current_app.logger.info(
+            "Import {0} reused the preview {1}: {2} translated and {3} matched "
+            "records.".format(
+                log.id,
+                preview_reuse.preview_log.id,
+                preview_reuse.translated_count,
+                preview_reuse.matched_count,
+            )
+        )
     log.finalize()
 
 
+def import_chunk_from_xml(
+    log,
+    source_path,
+    source_type,
+    provider,
+    mode,
+    header_size,
+    offset,
+    count,
+    ignore_missing_rules=False,
+):
+    """Load a chunk of the records of an xml file, along the other chunks.
+
+    The chunk imports ``count`` records from the byte ``offset`` of the
+    source. Each record is committed on its own, holding the locks of its
+    identifiers, and is indexed right away, so that the records imported
+    concurrently by the other chunks are matched. Returns the error which
+    stopped the chunk, if any.
+    """
+    if log.is_cancelled():
+        return
+
+    try:
+        # reset vocabularies validator cache
+        vocabulary_validator.reset()
+        # read the vocabularies files before importing the first record
+        vocabulary_registry.load()
+        validate_import(provider, mode, source_type)
+        with ExitStack() as stack:
+            stack.enter_context(importing_chunk())
+            stack.enter_context(matching_locks())
+            stack.enter_context(batched_transaction(1, locked=True))
+            source = stack.enter_context(open(source_path, "rb"))
+            records = islice(
+                iter_records(ResumedXMLFile(source, header_size, offset)), count
+            )
+            translated_records = stack.enter_context(
+                closing(translate_records(records, source_type, ignore_missing_rules))
+            )
+            translated_records = stack.enter_context(
+                closing(prefetch_vocabularies(translated_records))
+            )
+            import_records(log, translated_records, provider, mode)
+    except Exception as exc:
+        db.session.rollback()
+        handler = importer_exception_handlers.get(exc.__class__)
+        if handler:
+            handler(exc, log.id, None)
+        # the import is failed once, when all its chunks are imported
+        return "{0}: {1}".format(exc.__class__.__name__, exc)
+
+
+def finalize_chunked_import(log, errors):
+    """Set the status of an import once all its chunks are imported."""
+    if not log.is_running():
+        # cancelled meanwhile
+        return
+    errors = [error for error in errors if error]
+    if errors:
+        log.set_failed(ChunkedImportError(message="; ".join(errors)))
+    else:
+        log.set_succeeded()
+
+
 def allowed_files(filename):
     """Checks the extension of the files."""
     allowed_extensions = current_app.config["CDS_ILS_IMPORTER_FILE_EXTENSIONS_ALLOWED"]
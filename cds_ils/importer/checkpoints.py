@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer checkpoints module."""
+
+from array import array
+
+from invenio_app_ils.proxies import current_app_ils
+
+from cds_ils.importer.indexer import (
+    document_matching_keys,
+    eitem_matching_keys,
+    get_deferred_indexer,
+    series_matching_keys,
+)
+from cds_ils.importer.matching import get_identifiers_index
+from cds_ils.importer.models import ImporterMode, ImportRecordLog, flush_record_logs
+from cds_ils.importer.parse_xml import iter_record_offsets
+from cds_ils.importer.transaction import commit_batch
+
+
+class ImportCheckpoints(object):
+    """Checkpoints of an import, to resume it after an interruption.
+
+    Every ``interval`` entries, the buffered record logs and the pending
+    records to index are flushed and the number of processed entries is
+    committed together with the byte offset of the next entry. A resumed
+    import starts reading the source at the last checkpoint offset and
+    skips the entries logged after it, before the interruption.
+    """
+
+    def __init__(self, log, offsets, interval, resume=False):
+        """Constructor."""
+        self.log = log
+        self.offsets = offsets
+        self.interval = interval
+        self.start = 0
+        self.logged_entries = {}
+        if resume:
+            self.start = self._resume_index()
+            self.logged_entries = ImportRecordLog.get_logged_entries(log.id)
+
+    @classmethod
+    def scan(cls, log, source, interval, resume=False):
+        """Create the checkpoints of a binary XML source file."""
+        offsets = array("Q", iter_record_offsets(source))
+        return cls(log, offsets, interval, resume=resume)
+
+    def __len__(self):
+        """Return the number of entries of the source."""
+        return len(self.offsets)
+
+    def _offset(self, index):
+        """Return the offset of an entry, ``None`` past the last one."""
+        if index < len(self.offsets):
+            return self.offsets[index]
+
+    def _resume_index(self):
+        """Return the index to resume from, if the source did not change."""
+        index = self.log.checkpoint_index or 0
+        offset = self._offset(index)
+        if offset is not None and offset == self.log.checkpoint_offset:
+            return index
+        # the entries already logged are skipped anyway
+        return 0
+
+    @property
+    def header_size(self):
+        """Return the size of the source header, before the first entry."""
+        return self._offset(0) or 0
+
+    @property
+    def start_offset(self):
+        """Return the offset to start reading the entries from, if any."""
+        if self.start:
+            return self._offset(self.start)
+
+    def restore(self, record_recid):
+        """Skip an entry logged before the interruption of the import.
+
+        The records it imported are indexed again, as they were maybe
+        still pending in the deferred indexer when the import stopped.
+        """
+        record_log_id = self.logged_entries.pop(record_recid, None)
+        if record_log_id is None:
+            return False
+
+        if self.log.mode != ImporterMode.IMPORT:
+            return True
+        record_log = ImportRecordLog.query.get(record_log_id)
+        if record_log.action in ("create", "update") and record_log.output_pid:
+            restore_logged_records(record_log)
+        return True
+
+    def is_due(self, index):
+        """Check if a checkpoint is set after the given number of entries."""
+        return bool(self.interval) and index % self.interval == 0
+
+    def after(self, index):
+        """Set a checkpoint after the given number of processed entries."""
+        if self.is_due(index):
+            self.checkpoint(index)
+
+    def checkpoint(self, index):
+        """Commit the processed entries with the offset of the next one."""
+        flush_record_logs()
+        deferred_indexer = get_deferred_indexer()
+        if deferred_indexer:
+            deferred_indexer.flush()
+        self.log.set_checkpoint(index, self._offset(index))
+        # the side effects of the committed records are run with the commit
+        commit_batch()
+
+
+def restore_logged_records(record_log):
+    """Restore the matching state of the records imported for an entry."""
+    document = current_app_ils.document_record_cls.get_record_by_pid(
+        record_log.output_pid
+    )
+    identifiers_index = get_identifiers_index()
+    if identifiers_index is not None:
+        identifiers_index.add(document)
+
+    deferred_indexer = get_deferred_indexer()
+    if not deferred_indexer:
+        # indexed right after its import, before being committed
+        return
+
+    deferred_indexer.add(document, "documents", document_matching_keys(document))
+    eitem = record_log.get_report_field("eitem") or {}
+    if eitem.get("output_pid"):
+        eitem = current_app_ils.eitem_record_cls.get_record_by_pid(eitem["output_pid"])
+        deferred_indexer.add(eitem, "eitems", eitem_matching_keys(eitem))
+    for series in record_log.get_report_field("series") or []:
+        if series.get("output_pid"):
+            series_record = current_app_ils.series_record_cls.get_record_by_pid(
+                series["output_pid"]
+            )
+            deferred_indexer.add(
+                series_record, "series", series_matching_keys(series_record)
+            )
@@ -7,11 +7,15 @@
 
 """CDS-ILS Importer command lines module."""
 
+import os
+
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 
 from cds_ils.importer.api import import_from_xml
 from cds_ils.importer.models import ImporterAgent, ImporterImportLog, ImporterMode
+from cds_ils.importer.retention import prune_import_logs
 from cds_ils.importer.vocabularies_validator import validator as vocabulary_validator
 
 
@@ -51,6 +55,57 @@ def import_from_file(sources, provider, mode, source_type="marcxml"):
             source_type=source_type,
             mode=mode,
             original_filename=source,
+            source_path=source,
         )
     )
     import_from_xml(log, source, source_type, provider, mode, eager=True)
+
+
+@importer.command()
+@click.argument("log_id", type=int)
+@with_appcontext
+def resume(log_id):
+    """Resume an interrupted import from its last checkpoint."""
+    log = ImporterImportLog.query.get(log_id)
+    if log is None:
+        raise click.BadParameter("Import {0} does not exist.".format(log_id))
+    if not log.is_resumable():
+        raise click.BadParameter("Import {0} cannot be resumed.".format(log_id))
+    if not os.path.exists(log.source_path):
+        raise click.BadParameter(
+            "The source file of import {0} was deleted.".format(log_id)
+        )
+
+    log.set_resumed()
+    import_from_xml(
+        log,
+        log.source_path,
+        log.source_type,
+        log.provider,
+        log.mode.value,
+        log.ignore_missing_rules,
+        eager=True,
+        resume=True,
+    )
+
+
+@importer.command()
+@click.option(
+    "--archive",
+    type=click.Path(dir_okay=False, resolve_path=True),
+    help="Append the summaries of the pruned logs to this JSON lines file.",
+)
+@with_appcontext
+def prune(archive):
+    """Delete the importer logs past their retention."""
+    config = current_app.config
+    report = prune_import_logs(
+        config["CDS_ILS_IMPORTER_LOGS_RETENTION_DAYS"],
+        config["CDS_ILS_IMPORTER_LOGS_PRUNE_BATCH_SIZE"],
+        archive_path=archive or config["CDS_ILS_IMPORTER_LOGS_ARCHIVE_PATH"],
+    )
+    click.echo(
+        "Pruned {logs} importer logs: {rows} rows, {bytes} bytes reclaimed.".format(
+            **report
+        )
+    )
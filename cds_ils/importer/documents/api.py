@@ -76,8 +76,11 @@ def search_documents_by_video_url(url):
     return search
 
 
-def fuzzy_search_document(title, authors):
-    """Search fuzzy matches of document and title."""
+def fuzzy_search_document(title, authors, min_score=None):
+    """Search fuzzy matches of document and title.
+
+    The hits scoring below ``min_score``, when given, are left out.
+    """
     # check the fuzzy search options under:
     # https://www.elastic.co/guide/en/elasticsearch/reference/current/query-dsl-fuzzy-query.html
     document_search = current_app_ils.document_search_cls()
@@ -98,4 +101,6 @@ def fuzzy_search_document(title, authors):
             }
         )
     )
+    if min_score:
+        search = search.extra(min_score=min_score)
     return search
@@ -12,6 +12,7 @@ from copy import deepcopy
 
 import click
 from dateutil import parser
+from flask import current_app
 from invenio_app_ils.documents.api import DocumentIdProvider
 from invenio_app_ils.errors import IlsValidationError
 from invenio_app_ils.proxies import current_app_ils
@@ -29,6 +30,9 @@ from cds_ils.importer.documents.api import (
     search_documents_by_video_url,
 )
 from cds_ils.importer.errors import SimilarityMatchUnavailable
+from cds_ils.importer.records import get_documents_cache, get_records_by_pids
+from cds_ils.importer.similarity import get_similarity_index
+from cds_ils.importer.transaction import commit, is_batched, rollback
 from cds_ils.importer.vocabularies_validator import validator as vocabulary_validator
 
 VOCABULARIES_FIELDS = {
@@ -174,12 +178,12 @@ class DocumentImporter(object):
                 created_date = cleaned_json.get("_created")
                 if created_date:
                     document.model.created = parser.parse(created_date)
-            db.session.commit()
+            commit()
             return document
         except IlsValidationError as e:
             click.secho("Field: {}".format(e.errors[0].res["field"]), fg="red")
             click.secho(e.original_exception.message, fg="red")
-            db.session.rollback()
+            rollback()
             raise e
 
     def _update_field_identifiers(self, matched_document):
@@ -226,12 +230,15 @@ class DocumentImporter(object):
             if created_date:
                 matched_document.model.created = parser.parse(created_date)
             matched_document.commit()
-            db.session.commit()
+            commit()
             self._after_update(matched_document)
         except IlsValidationError as e:
             click.secho("Field: {}".format(e.errors[0].res["field"]), fg="red")
             click.secho(e.original_exception.message, fg="red")
-            db.session.rollback()
+            rollback()
+            if is_batched():
+                # the changes are committed with the batch unless rolled back
+                raise e
 
     def _validate_provider_identifiers(self, existing_document):
         """Validate identifiers between matches."""
@@ -364,8 +371,10 @@ class DocumentImporter(object):
         import_doc_edition = self.json_data.get("edition")
         import_doc_publication_year = self.json_data.get("publication_year")
 
-        for pid_value in not_validated_matches:
-            document = document_class.get_record_by_pid(pid_value)
+        documents = get_records_by_pids(
+            document_class, not_validated_matches, cache=get_documents_cache()
+        )
+        for pid_value, document in zip(not_validated_matches, documents):
             document_title = document["title"]
             document_edition = document.get("edition")
             doc_pub_year = document.get("publication_year")
@@ -376,8 +385,8 @@ class DocumentImporter(object):
                 eitem_search = current_app_ils.eitem_search_cls()
                 eitem_cls = current_app_ils.eitem_record_cls
                 document_eitems = eitem_search.search_by_document_pid(pid_value)
-                for hit in document_eitems:
-                    document_eitem = eitem_cls.get_record_by_pid(hit.pid)
+                eitem_pids = [hit.pid for hit in document_eitems]
+                for document_eitem in get_records_by_pids(eitem_cls, eitem_pids):
                     if self._matching_video_urls(import_eitem, document_eitem):
                         matches.append(pid_value)
 
@@ -423,58 +432,35 @@ class DocumentImporter(object):
 
         return match, partial_matches
 
-    def search_for_matching_documents(self):
-        """Find matching documents."""
-        isbn_list = [
-            identifier["value"]
-            for identifier in self.json_data.get("identifiers", [])
-            if identifier["scheme"] == "ISBN"
-        ]
-
-        doi_list = [
-            identifier["value"]
-            for identifier in self.json_data.get("identifiers", [])
-            if identifier["scheme"] == "DOI"
-        ]
+    def matching_searches(self):
+        """Return the searches for matching documents, with their keys.
 
-        # TODO: match by standard number
-        standard_number_list = [
-            identifier["value"]
-            for identifier in self.json_data.get("identifiers", [])
-            if identifier["scheme"] == "STANDARD_NUMBER"
-        ]
-
-        matches = []
+        The searches are returned in the order their results are ranked,
+        each paired with the key it matches on.
+        """
+        identifiers = self.json_data.get("identifiers", [])
+        searches = []
 
         # match videos by URL
         import_eitem = self.json_data.get("_eitem", {})
         if import_eitem.get("_type") == "video":
-            import_urls_list = [
-                entry["value"] for entry in import_eitem.get("urls", [])
-            ]
-
-            for url in import_urls_list:
-                search = search_documents_by_video_url(url)
-                results = search.scan()
-                matches += [x.pid for x in results if x.pid not in matches]
-
-        # check by isbn first
-        for isbn in isbn_list:
-            search = search_documents_by_isbn(isbn)
-            results = search.scan()
-            matches += [x.pid for x in results if x.pid not in matches]
-
-        # check by doi
-        for doi in doi_list:
-            search = search_documents_by_doi(doi)
-            results = search.scan()
-            matches += [x.pid for x in results if x.pid not in matches]
-
-        # check by standard number
-        for standard_number in standard_number_list:
-            search = search_documents_by_standard_number(standard_number)
-            results = search.scan()
-            matches += [x.pid for x in results if x.pid not in matches]
+            for entry in import_eitem.get("urls", []):
+                url = entry["value"]
+                searches.append((("url", url), search_documents_by_video_url(url)))
+
+        # check by isbn first, then by doi and by standard number
+        searches_by_scheme = (
+            ("ISBN", search_documents_by_isbn),
+            ("DOI", search_documents_by_doi),
+            ("STANDARD_NUMBER", search_documents_by_standard_number),
+        )
+        for scheme, search_documents in searches_by_scheme:
+            for identifier in identifiers:
+                if identifier["scheme"] == scheme:
+                    value = identifier["value"]
+                    searches.append(
+                        (("identifier", scheme, value), search_documents(value))
+                    )
 
         title = self.json_data.get("title", None)
 
@@ -492,9 +478,32 @@ class DocumentImporter(object):
             if subtitle_obj:
                 subtitle = subtitle_obj[0]["value"]
 
-            search = search_document_by_title_authors(title, authors, subtitle=subtitle)
-            results = search.scan()
-            matches += [x.pid for x in results if x.pid not in matches]
+            searches.append(
+                (
+                    ("title", self._normalize_title(title)),
+                    search_document_by_title_authors(title, authors, subtitle=subtitle),
+                )
+            )
+
+        return searches
+
+    def search_for_matching_documents(self, matches_cache=None, identifiers_index=None):
+        """Find matching documents.
+
+        The identifiers index and the prefetched results are used when given,
+        falling back to searching.
+        """
+        matches = []
+
+        for key, matching_search in self.matching_searches():
+            pids = None
+            if identifiers_index is not None and identifiers_index.covers(key):
+                pids = identifiers_index.get(key)
+            elif matches_cache:
+                pids = matches_cache.get(matching_search)
+            if pids is None:
+                pids = [x.pid for x in matching_search.scan()]
+            matches += [pid for pid in pids if pid not in matches]
 
         return matches
 
@@ -506,11 +515,28 @@ class DocumentImporter(object):
         if is_part_of_serial or not title:
             return []
         authors = [author["full_name"] for author in self.json_data.get("authors", [])]
+        config = current_app.config
+        max_hits = config["CDS_ILS_IMPORTER_FUZZY_MATCH_MAX_HITS"]
+        similarity_index = get_similarity_index()
+        if (
+            similarity_index is not None
+            and config["CDS_ILS_IMPORTER_SIMILARITY_ENGINE"] == "local"
+        ):
+            return similarity_index.search(title, authors, max_hits)
+
+        fuzzy_search = fuzzy_search_document(
+            title, authors, min_score=config["CDS_ILS_IMPORTER_FUZZY_MATCH_MIN_SCORE"]
+        )
         try:
-            fuzzy_results = fuzzy_search_document(title, authors).scan()
+            if max_hits:
+                # the best scored hits only
+                return list(fuzzy_search[:max_hits].execute())
+            return list(fuzzy_search.scan())
         except search.TransportError:
+            if similarity_index is not None:
+                # the search engine is unavailable, match locally
+                return similarity_index.search(title, authors, max_hits)
             raise SimilarityMatchUnavailable
-        return fuzzy_results
 
     def preview_document_import(self):
         """Preview document import JSON."""
@@ -8,6 +8,7 @@
 """CDS-ILS EItem Importer module."""
 
 import uuid
+from functools import partial
 
 import click
 from flask import current_app
@@ -21,6 +22,13 @@ from invenio_app_ils.proxies import current_app_ils
 from invenio_db import db
 from invenio_pidstore.models import PersistentIdentifier
 
+from cds_ils.importer.transaction import (
+    after_commit,
+    commit,
+    is_batched,
+    rollback,
+)
+
 
 class EItemImporter(object):
     """EItem importer class."""
@@ -103,12 +111,15 @@ class EItemImporter(object):
         try:
             existing_eitem.update(metadata_to_update)
             existing_eitem.commit()
-            db.session.commit()
+            commit()
             return existing_eitem
         except IlsValidationError as e:
-            db.session.rollback()
+            rollback()
             click.secho("Field: {}".format(e.errors[0].res["field"]), fg="red")
             click.secho(e.original_exception.message, fg="red")
+            if is_batched():
+                # the changes are committed with the batch unless rolled back
+                raise e
 
     def _delete_existing_record(self, existing_eitem):
         eitem_indexer = current_app_ils.eitem_indexer
@@ -124,8 +135,8 @@ class EItemImporter(object):
         for rec_pid in all_pids:
             if not rec_pid.is_deleted():
                 rec_pid.delete()
-        db.session.commit()
-        eitem_indexer.delete(existing_eitem)
+        commit()
+        after_commit(partial(eitem_indexer.delete, existing_eitem))
         return existing_eitem
 
     def _report_duplicate_records(self, multiple_results):
@@ -174,8 +185,8 @@ class EItemImporter(object):
                 for rec_pid in all_pids:
                     if not rec_pid.is_deleted():
                         rec_pid.delete()
-                db.session.commit()
-                eitem_indexer.delete(eitem)
+                commit()
+                after_commit(partial(eitem_indexer.delete, eitem))
         if self.deleted_list:
             self.action = "replace"
 
@@ -347,14 +358,14 @@ class EItemImporter(object):
 
                     self.eitem_json["pid"] = provider.pid.pid_value
                     self.eitem_record = eitem_cls.create(self.eitem_json, record_uuid)
-                db.session.commit()
+                commit()
                 self.action = "create"
                 self.output_pid = self.eitem_record["pid"]
                 return self.eitem_record
             except IlsValidationError as e:
                 click.secho("Field: {}".format(e.errors[0].res["field"]), fg="red")
                 click.secho(e.original_exception.message, fg="red")
-                db.session.rollback()
+                rollback()
                 raise e
 
     def summary(self):
@@ -136,3 +136,9 @@ class SimilarityMatchUnavailable(CDSImporterException):
         "Title similarity matching cannot be performed for "
         "this record. Please import it manually."
     )
+
+
+class ChunkedImportError(CDSImporterException):
+    """Chunked import exception."""
+
+    message = "Some chunks of the import failed."
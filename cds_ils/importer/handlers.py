@@ -6,6 +6,9 @@
 # the terms of the MIT License; see LICENSE file for more details.
 
 """CDS-ILS Importer exception handlers module."""
+from contextlib import contextmanager
+
+from flask import g
 from invenio_app_ils.errors import (
     IlsValidationError,
     RecordHasReferencesError,
@@ -30,14 +33,34 @@ from cds_ils.importer.errors import (
 from cds_ils.importer.models import ImportRecordLog
 
 
+def is_importing_chunk():
+    """Check if a chunk of a chunked import is being imported."""
+    return g.get("importer_chunk", False)
+
+
+@contextmanager
+def importing_chunk():
+    """Leave the failure of the import to its finalization, once chunked."""
+    g.importer_chunk = True
+    try:
+        yield
+    finally:
+        g.importer_chunk = False
+
+
 def get_importer_handler(exc, log):
-    """Get correct exception handler."""
+    """Get correct exception handler.
+
+    The unknown exceptions fail the import. They only stop the chunk of a
+    chunked import, which is failed once all its chunks are imported.
+    """
     if exc.__class__ in importer_exception_handlers:
         handler = importer_exception_handlers[exc.__class__]
         if handler is not None:
             return handler
     else:
-        log.set_failed(exc)
+        if not is_importing_chunk():
+            log.set_failed(exc)
         raise exc
 
 
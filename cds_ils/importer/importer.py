@@ -6,8 +6,11 @@
 # the terms of the MIT License; see LICENSE file for more details.
 
 """CDS-ILS Importer module."""
+import hashlib
+import json
 import time
 from copy import deepcopy
+from functools import partial
 
 import importlib_metadata
 from flask import current_app
@@ -15,8 +18,8 @@ from invenio_app_ils.errors import RecordHasReferencesError
 from invenio_app_ils.proxies import current_app_ils
 from invenio_app_ils.records_relations.api import RecordRelationsParentChild
 from invenio_app_ils.relations.api import Relation
-from invenio_db import db
 from invenio_indexer.api import RecordIndexer
+from invenio_pidstore.errors import PersistentIdentifierError
 from invenio_pidstore.models import PersistentIdentifier
 from invenio_search import current_search
 from invenio_search.engine import search
@@ -28,7 +31,27 @@ from cds_ils.importer.errors import (
     SimilarityMatchUnavailable,
     UnknownProvider,
 )
+from cds_ils.importer.indexer import (
+    document_matching_keys,
+    eitem_matching_keys,
+    get_deferred_indexer,
+    series_matching_keys,
+)
+from cds_ils.importer.locks import (
+    is_locking,
+    lock_matching_keys,
+    matching_lock_keys,
+)
+from cds_ils.importer.matching import (
+    get_document_matches_cache,
+    get_identifiers_index,
+)
+from cds_ils.importer.models import ImportRecordHash
+from cds_ils.importer.previews import get_preview_reuse, get_previewed_match
+from cds_ils.importer.records import get_documents_cache
 from cds_ils.importer.series.importer import SeriesImporter
+from cds_ils.importer.similarity import get_similarity_index
+from cds_ils.importer.transaction import after_commit, commit
 
 from .errors import DocumentHasReferencesError
 
@@ -40,6 +63,8 @@ class Importer(object):
     IS_PROVIDER_PRIORITY_SENSITIVE = False
     EITEM_OPEN_ACCESS = True
     EITEM_URLS_LOGIN_REQUIRED = True
+    # documents are matched by the searches of the document importer
+    BATCH_MATCHING = True
 
     HELPER_METADATA_FIELDS = (
         "_eitem",
@@ -99,11 +124,67 @@ class Importer(object):
         """Extracts eitems json for given pre-processed JSON."""
         return deepcopy(self.json_data["_eitem"])
 
+    def _matching_keys(self):
+        """Return the keys the imported records can be matched with."""
+        keys = document_matching_keys(self.json_data)
+        keys |= eitem_matching_keys(self.json_data.get("_eitem") or {})
+        for json_series in self.json_data.get("_serial") or []:
+            keys |= series_matching_keys(json_series)
+        return keys
+
+    def _json_hash(self):
+        """Return a stable hash of the JSON of the record."""
+        serialized = json.dumps(
+            self.json_data, sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _find_unchanged_document(self, json_hash):
+        """Return the document imported last time from the same JSON, if any."""
+        provider_recid = self.json_data.get("provider_recid")
+        if not json_hash or not provider_recid:
+            return None
+
+        record_hash = ImportRecordHash.get(self.metadata_provider, provider_recid)
+        if record_hash is None or record_hash.json_hash != json_hash:
+            return None
+        try:
+            document_class = current_app_ils.document_record_cls
+            return document_class.get_record_by_pid(record_hash.document_pid)
+        except PersistentIdentifierError:
+            # deleted since the last import
+            return None
+
+    def _store_json_hash(self, json_hash, document):
+        """Store the hash of the JSON the document was imported from."""
+        provider_recid = self.json_data.get("provider_recid")
+        if json_hash and provider_recid and document:
+            ImportRecordHash.store(
+                self.metadata_provider, provider_recid, json_hash, document["pid"]
+            )
+
     def _match_document(self):
         """Search the catalogue for existing document."""
         document_importer = self.document_importer
+        deferred_indexer = get_deferred_indexer()
 
-        not_validated_matches = document_importer.search_for_matching_documents()
+        if is_locking():
+            # wait for the concurrent imports of the same records
+            lock_matching_keys(matching_lock_keys(self.json_data))
+
+        if deferred_indexer:
+            # records imported earlier in this run must be searchable
+            deferred_indexer.ensure_indexed(self._matching_keys())
+
+        not_validated_matches = document_importer.search_for_matching_documents(
+            matches_cache=get_document_matches_cache(),
+            identifiers_index=get_identifiers_index(),
+        )
+
+        if deferred_indexer:
+            deferred_indexer.ensure_indexed(
+                {("document", pid) for pid in not_validated_matches}
+            )
 
         exact_match, partial_matching_pids = document_importer.validate_found_matches(
             not_validated_matches
@@ -116,8 +197,53 @@ class Importer(object):
         self.eitem_importer.delete_eitems(matched_document)
         return self.eitem_importer.summary()
 
+    def defer_indexing(self, deferred_indexer, document, eitem, series_list):
+        """Defer the indexing of imported records to the end of the chunk."""
+        eitem_class = current_app_ils.eitem_record_cls
+
+        if eitem and eitem["output_pid"]:
+            eitem = eitem_class.get_record_by_pid(eitem["output_pid"])
+            deferred_indexer.add(eitem, "eitems", eitem_matching_keys(eitem))
+
+        deferred_indexer.add(document, "documents", document_matching_keys(document))
+
+        for series in series_list:
+            series_record = series["series_record"]
+            deferred_indexer.add(
+                series_record, "series", series_matching_keys(series_record)
+            )
+
+    def update_matching(self, document, eitem=None, deleted=False):
+        """Update the matching state with the imported records."""
+        for index in (get_identifiers_index(), get_similarity_index()):
+            if index is None:
+                continue
+            if deleted:
+                index.remove(document)
+            else:
+                index.add(document)
+
+        keys = document_matching_keys(document)
+        if eitem and eitem["json"]:
+            keys |= eitem_matching_keys(eitem["json"])
+        matches_cache = get_document_matches_cache()
+        if matches_cache:
+            matches_cache.invalidate(keys)
+        documents_cache = get_documents_cache()
+        if documents_cache is not None:
+            documents_cache.invalidate(document["pid"])
+        preview_reuse = get_preview_reuse()
+        if preview_reuse:
+            preview_reuse.invalidate(keys)
+
     def index_records(self, document, eitem, series_list):
         """Index imported records."""
+        self.update_matching(document, eitem)
+        deferred_indexer = get_deferred_indexer()
+        if deferred_indexer:
+            self.defer_indexing(deferred_indexer, document, eitem, series_list)
+            return
+
         # we are using general indexer instead of type dedicated classes
         # in order to avoid version mismatch on references
         record_indexer = RecordIndexer()
@@ -154,6 +280,16 @@ class Importer(object):
         # (inconsistent identifiers/title pairs, duplicates etc)
         ambiguous_matches = [{"pid": match, "type": "ambiguous"} for match in pids_list]
 
+        deferred_indexer = get_deferred_indexer()
+        if deferred_indexer:
+            # similar documents imported earlier in this run must be searchable
+            authors = [
+                author["full_name"] for author in self.json_data.get("authors", [])
+            ]
+            deferred_indexer.ensure_similar_indexed(
+                self.json_data.get("title"), authors
+            )
+
         # fuzzy = trying to match similar titles and authors to spot typos
         try:
             fuzzy_results = self.document_importer.fuzzy_match_documents()
@@ -187,15 +323,29 @@ class Importer(object):
         action = None
         self._validate_provider()
 
-        exact_match, partial_matches = self._match_document()
-        # finds the multiple matches or fuzzy matches, does not create new doc
-        # requires manual intervention, to avoid duplicates
-        partial_matches = self.find_partial_matches(partial_matches, exact_match)
+        json_hash = None
+        if current_app.config["CDS_ILS_IMPORTER_SKIP_UNCHANGED"]:
+            # hashed before the import changes the JSON
+            json_hash = self._json_hash()
+            unchanged_document = self._find_unchanged_document(json_hash)
+            if unchanged_document:
+                return self.report(document=unchanged_document, action="unchanged")
+
+        previewed_match = get_previewed_match(self.json_data)
+        if previewed_match is not None:
+            # matched by the preview of the same source, still valid
+            exact_match, partial_matches = previewed_match
+        else:
+            exact_match, partial_matches = self._match_document()
+            # finds the multiple matches or fuzzy matches, does not create new
+            # doc, requires manual intervention, to avoid duplicates
+            partial_matches = self.find_partial_matches(partial_matches, exact_match)
 
         # finds the exact match, update records
         if exact_match:
             document, eitem, series = self.update_exact_match(exact_match)
             self.index_records(document, eitem, series)
+            self._store_json_hash(json_hash, document)
             return self.report(
                 document=document,
                 action="update",
@@ -211,6 +361,7 @@ class Importer(object):
             eitem = self.eitem_importer.summary()
             series = self.series_importer.import_series(document)
             self.index_records(document, eitem, series)
+            self._store_json_hash(json_hash, document)
 
         return self.report(
             document=document,
@@ -235,7 +386,7 @@ class Importer(object):
             matched_document = document_class.get_record_by_pid(exact_match)
 
             eitem = self.delete_eitem(matched_document)
-            db.session.commit()
+            commit()
             current_search.flush_and_refresh(index="*")
             document_has_only_serial_relations = (
                 len(matched_document.relations.keys())
@@ -254,6 +405,7 @@ class Importer(object):
                     serial = series_class.get_record_by_pid(relation["pid_value"])
                     rr.remove(serial, matched_document, relation_type)
 
+            self.update_matching(matched_document, deleted=True)
             pid = matched_document.pid
             # will fail if any relations / references present
             matched_document.delete()
@@ -266,8 +418,8 @@ class Importer(object):
                 if not rec_pid.is_deleted():
                     rec_pid.delete()
 
-            db.session.commit()
-            document_indexer.delete(matched_document)
+            commit()
+            after_commit(partial(document_indexer.delete, matched_document))
             return self.report(
                 document=matched_document,
                 action="delete",
@@ -284,6 +436,7 @@ class Importer(object):
         partial_matches=None,
         eitem=None,
         series=None,
+        match_revision_id=None,
     ):
         """Generate import report."""
         doc_json = {}
@@ -299,6 +452,7 @@ class Importer(object):
             "series": series,
             "raw_json": self.json_data,
             "document_json": doc_json,
+            "match_revision_id": match_revision_id,
         }
 
     def preview_delete(self):
@@ -335,8 +489,10 @@ class Importer(object):
         # requires manual intervention, to avoid duplicates
         partial_matches = self.find_partial_matches(partial_matches, exact_match)
 
+        match_revision_id = None
         if exact_match:
             document = document_class.get_record_by_pid(exact_match)
+            match_revision_id = document.revision_id
             document = self.document_importer.preview_document_update(document)
             action = "update"
         else:
@@ -355,6 +511,7 @@ class Importer(object):
             eitem=eitem,
             series=series,
             partial_matches=partial_matches,
+            match_revision_id=match_revision_id,
         )
 
     def preview_delete_document(self, document):
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer deferred indexing module."""
+
+from contextlib import contextmanager
+
+from flask import current_app, g
+from invenio_indexer.api import RecordIndexer
+from invenio_search import current_search
+
+from cds_ils.importer.documents.importer import DocumentImporter
+from cds_ils.importer.series.importer import SeriesImporter
+from cds_ils.importer.similarity import SimilarityIndex
+
+
+def document_matching_keys(document):
+    """Return the keys a document can be matched with."""
+    keys = {("document", document.get("pid"))}
+    keys.add(("title", DocumentImporter._normalize_title(document.get("title"))))
+    for identifier in document.get("identifiers", []):
+        keys.add(("identifier", identifier["scheme"], identifier["value"]))
+    return keys
+
+
+def eitem_matching_keys(eitem):
+    """Return the keys an e-item can be matched with."""
+    keys = {("document", eitem.get("document_pid"))}
+    for url in eitem.get("urls", []):
+        keys.add(("url", url["value"]))
+    return keys
+
+
+def series_matching_keys(series):
+    """Return the keys a series can be matched with."""
+    keys = {("series_title", SeriesImporter._normalize_title(series.get("title")))}
+    for identifier in series.get("identifiers", []):
+        keys.add(("series_identifier", identifier["value"]))
+    return keys
+
+
+class DeferredIndexer(object):
+    """Index the imported records in bulk, in chunks.
+
+    The touched records are indexed together once ``chunk_size`` of them
+    are pending, refreshing each index once per chunk. The pending records
+    are indexed earlier when a record sharing one of their matching keys
+    is about to be matched, or when a pending document is similar to a record
+    about to be fuzzy matched, so that matching in the same run stays correct.
+    The records of an imported record are only pending once it succeeds, so
+    that the records of a rolled back record are never indexed.
+    """
+
+    def __init__(self, chunk_size, similarity_threshold):
+        """Constructor."""
+        self.chunk_size = chunk_size
+        self.similarity_threshold = similarity_threshold
+        self.pending = {}
+        self.pending_keys = set()
+        self.pending_documents = SimilarityIndex(similarity_threshold)
+        self.staged = None
+
+    @contextmanager
+    def staging(self):
+        """Stage the records added in the block until it succeeds."""
+        staged = self.staged = []
+        try:
+            yield
+        finally:
+            self.staged = None
+        for record, index, keys in staged:
+            self.add(record, index, keys)
+
+    def add(self, record, index, keys):
+        """Defer the indexing of a record."""
+        if self.staged is not None:
+            self.staged.append((record, index, keys))
+            return
+        self.pending[str(record.id)] = index
+        self.pending_keys |= keys
+        if index == "documents":
+            self.pending_documents.add(record)
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def ensure_indexed(self, keys):
+        """Index the pending records if any of them has one of the keys."""
+        if not self.pending_keys.isdisjoint(keys):
+            self.flush()
+
+    def ensure_similar_indexed(self, title, authors):
+        """Index the pending records if a pending document is similar."""
+        if self.pending_documents.search(title, authors, max_hits=1):
+            self.flush()
+
+    def flush(self):
+        """Bulk index the pending records and refresh their indices."""
+        if not self.pending:
+            return
+        record_indexer = RecordIndexer()
+        record_indexer.bulk_index(list(self.pending))
+        record_indexer.process_bulk_queue()
+        for index in sorted(set(self.pending.values())):
+            current_search.flush_and_refresh(index=index)
+        self.pending = {}
+        self.pending_keys = set()
+        self.pending_documents = SimilarityIndex(self.similarity_threshold)
+
+
+def get_deferred_indexer():
+    """Return the deferred indexer of the current import, if any."""
+    return g.get("importer_deferred_indexer")
+
+
+@contextmanager
+def staged_indexing():
+    """Index the records of an imported record only if it succeeds."""
+    deferred_indexer = get_deferred_indexer()
+    if not deferred_indexer:
+        yield
+        return
+    with deferred_indexer.staging():
+        yield
+
+
+@contextmanager
+def deferred_indexing(chunk_size):
+    """Defer the indexing of the records imported in the block."""
+    if not chunk_size:
+        yield
+        return
+
+    deferred_indexer = DeferredIndexer(
+        chunk_size, current_app.config["CDS_ILS_IMPORTER_SIMILARITY_THRESHOLD"]
+    )
+    g.importer_deferred_indexer = deferred_indexer
+    try:
+        yield
+    finally:
+        g.importer_deferred_indexer = None
+        deferred_indexer.flush()
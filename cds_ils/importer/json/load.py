@@ -7,8 +7,11 @@
 
 """CDS-IlS JSON Importer load module."""
 
+from flask import current_app
 from invenio_db import db
 
+from cds_ils.importer.locks import matching_locks
+from cds_ils.importer.transaction import batched_transaction, commit_batch
 from cds_ils.importer.XMLRecordLoader import XMLRecordDumpLoader
 
 
@@ -24,11 +27,14 @@ class ILSLoader:
 
     def load(self, entry):
         """Load record based on JSON entry input."""
+        locking = current_app.config["CDS_ILS_IMPORTER_MATCHING_LOCKS"]
         try:
-            report = XMLRecordDumpLoader.import_from_json(
-                entry, True, self.metadata_provider, self.mode
-            )
-            db.session.commit()
+            # the locks are held until the whole record is committed
+            with matching_locks(locking), batched_transaction(1, locked=locking):
+                report = XMLRecordDumpLoader.import_from_json(
+                    entry, True, self.metadata_provider, self.mode
+                )
+            commit_batch()
             return report
         except Exception as e:
             db.session.rollback()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer matching locks module."""
+
+import hashlib
+from contextlib import contextmanager
+
+from flask import current_app, g
+from invenio_db import db
+from sqlalchemy import text
+
+from cds_ils.importer.documents.importer import DocumentImporter
+from cds_ils.importer.series.importer import SeriesImporter
+
+LOCKED_IDENTIFIER_SCHEMES = ("ISBN", "DOI", "STANDARD_NUMBER")
+
+
+def _normalize_identifier(value):
+    """Return an identifier value without separators, upper case."""
+    return "".join(value.replace("-", "").split()).upper()
+
+
+def _normalize_name(name):
+    """Return a lower case name, with single spaces."""
+    return " ".join((name or "").lower().split())
+
+
+def matching_lock_keys(json_data):
+    """Return the keys locked while matching and importing a record.
+
+    They are the keys a record can match an existing one with: its document
+    identifiers, its title with its authors and the titles and identifiers
+    of its series.
+    """
+    keys = set()
+    for identifier in json_data.get("identifiers", []):
+        if identifier["scheme"] in LOCKED_IDENTIFIER_SCHEMES:
+            keys.add(("identifier", _normalize_identifier(identifier["value"])))
+
+    title = json_data.get("title")
+    if title:
+        authors = sorted(
+            _normalize_name(author.get("full_name"))
+            for author in json_data.get("authors", [])
+        )
+        keys.add(("title", DocumentImporter._normalize_title(title), tuple(authors)))
+
+    for series in json_data.get("_serial") or []:
+        keys.add(("series_title", SeriesImporter._normalize_title(series.get("title"))))
+        for identifier in series.get("identifiers", []):
+            keys.add(("series_identifier", _normalize_identifier(identifier["value"])))
+    return keys
+
+
+def lock_id(key):
+    """Return the advisory lock id of a matching key, a signed 64-bit int."""
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def is_locking():
+    """Check if the imported records lock their matching keys."""
+    return g.get("importer_matching_locks", False)
+
+
+def supports_locks():
+    """Check if the database supports the matching locks."""
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def lock_matching_keys(keys):
+    """Lock the matching keys until the end of the transaction.
+
+    The locks are taken in a stable order, so that two records sharing
+    several keys never wait for each other.
+    """
+    if not supports_locks():
+        # warned when the locks are enabled
+        return
+    for id_ in sorted({lock_id(key) for key in keys}):
+        db.session.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": id_})
+
+
+@contextmanager
+def matching_locks(enabled=True):
+    """Lock the matching keys of the records imported in the block.
+
+    A record importing concurrently with another record sharing one of its
+    keys waits until the other one is committed and indexed, so that it
+    matches the created document instead of creating a duplicate.
+    """
+    if not enabled:
+        yield
+        return
+
+    if not supports_locks():
+        current_app.logger.warning(
+            "Importer matching locks are only supported by PostgreSQL, the "
+            "records imported concurrently may be duplicated."
+        )
+    g.importer_matching_locks = True
+    try:
+        yield
+    finally:
+        g.importer_matching_locks = False
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer batched matching module."""
+
+import json
+import sys
+from contextlib import contextmanager
+from itertools import islice
+
+from flask import current_app, g
+from invenio_app_ils.proxies import current_app_ils
+from invenio_search.engine import dsl, search
+
+from cds_ils.importer.indexer import get_deferred_indexer
+
+
+class DocumentMatchesCache(object):
+    """Results of the document matching searches of a chunk of records.
+
+    The searches of all the records of a chunk are sent together in a single
+    multi search request. A search not found in the cache, because it has
+    more than ``max_hits`` results or because its results were invalidated
+    by an import of the same run, is run on its own as before.
+    """
+
+    def __init__(self, max_hits):
+        """Constructor."""
+        self.max_hits = max_hits
+        self.results = {}
+        self.keys = {}
+
+    @staticmethod
+    def _query(matching_search):
+        """Return the cache key of a search."""
+        return json.dumps(matching_search.to_dict(), sort_keys=True)
+
+    def prefetch(self, searches):
+        """Run the given ``(key, search)`` pairs in a single multi search."""
+        unique_searches = {}
+        for key, matching_search in searches:
+            unique_searches.setdefault(
+                self._query(matching_search), (key, matching_search)
+            )
+        if not unique_searches:
+            return
+
+        multi_search = None
+        for _, matching_search in unique_searches.values():
+            if multi_search is None:
+                multi_search = dsl.MultiSearch(using=matching_search._using)
+            # sorted by index order, as the results of a scan
+            multi_search = multi_search.add(
+                matching_search.sort("_doc")
+                .source(["pid"])
+                .extra(size=self.max_hits, track_total_hits=True)
+            )
+
+        try:
+            responses = multi_search.execute()
+        except search.TransportError:
+            # each record falls back to its own searches
+            return
+
+        for (query, (key, _)), response in zip(unique_searches.items(), responses):
+            if not response.success() or response.hits.total.value > len(response.hits):
+                continue
+            self.results[query] = [hit.pid for hit in response.hits]
+            self.keys[query] = key
+
+    def get(self, matching_search):
+        """Return the prefetched pids matched by a search, if any."""
+        return self.results.get(self._query(matching_search))
+
+    def invalidate(self, keys):
+        """Drop the results of the searches matching on any of the keys."""
+        for query, key in list(self.keys.items()):
+            if key in keys:
+                del self.results[query]
+                del self.keys[query]
+
+
+class IdentifiersIndex(object):
+    """Identifiers of the catalogue documents, mapped to their pids.
+
+    The index is loaded once per import from the documents index and kept
+    up to date with the documents imported in the same run. It answers the
+    exact identifier matching locally, the other matching searches still go
+    to the search engine.
+    """
+
+    SCHEMES = ("ISBN", "DOI", "STANDARD_NUMBER")
+
+    def __init__(self):
+        """Constructor."""
+        self.pids = {scheme: {} for scheme in self.SCHEMES}
+
+    def __len__(self):
+        """Return the number of indexed identifiers."""
+        return sum(len(values) for values in self.pids.values())
+
+    def load(self):
+        """Load the identifiers of all the catalogue documents."""
+        document_search = current_app_ils.document_search_cls()
+        documents = document_search.filter(
+            "terms", identifiers__scheme=list(self.SCHEMES)
+        ).source(["pid", "identifiers"])
+        for document in documents.scan():
+            self.add(document.to_dict())
+        return self
+
+    def add(self, document):
+        """Index the identifiers of a document."""
+        pid = sys.intern(document["pid"])
+        for identifier in document.get("identifiers", []):
+            values = self.pids.get(identifier["scheme"])
+            if values is None:
+                continue
+            pids = values.get(identifier["value"], ())
+            if pid not in pids:
+                values[identifier["value"]] = pids + (pid,)
+
+    def remove(self, document):
+        """Remove the identifiers of a document from the index."""
+        pid = document["pid"]
+        for identifier in document.get("identifiers", []):
+            values = self.pids.get(identifier["scheme"])
+            if values is None or identifier["value"] not in values:
+                continue
+            pids = tuple(p for p in values[identifier["value"]] if p != pid)
+            if pids:
+                values[identifier["value"]] = pids
+            else:
+                del values[identifier["value"]]
+
+    def covers(self, key):
+        """Check if the matching on the key is answered by the index."""
+        return key[0] == "identifier" and key[1] in self.pids
+
+    def get(self, key):
+        """Return the pids of the documents matching on the key."""
+        _, scheme, value = key
+        return list(self.pids[scheme].get(value, ()))
+
+    def footprint(self):
+        """Return the approximate memory used by the index, in bytes."""
+        size = sys.getsizeof(self.pids)
+        seen_pids = set()
+        for values in self.pids.values():
+            size += sys.getsizeof(values)
+            for value, pids in values.items():
+                size += sys.getsizeof(value) + sys.getsizeof(pids)
+                for pid in pids:
+                    if id(pid) not in seen_pids:
+                        seen_pids.add(id(pid))
+                        size += sys.getsizeof(pid)
+        return size
+
+
+def get_identifiers_index():
+    """Return the identifiers index of the current import, if any."""
+    return g.get("importer_identifiers_index")
+
+
+@contextmanager
+def preloaded_identifiers_index(enabled):
+    """Match the identifiers of the records imported in the block locally."""
+    if not enabled:
+        yield
+        return
+
+    identifiers_index = IdentifiersIndex().load()
+    current_app.logger.info(
+        "Importer identifiers index loaded: {0} identifiers, {1} bytes".format(
+            len(identifiers_index), identifiers_index.footprint()
+        )
+    )
+    g.importer_identifiers_index = identifiers_index
+    try:
+        yield
+    finally:
+        g.importer_identifiers_index = None
+
+
+def get_document_matches_cache():
+    """Return the document matches cache of the current chunk, if any."""
+    return g.get("importer_document_matches_cache")
+
+
+def prefetch_document_matches(
+    translated_records, importer_class, provider, chunk_size, max_hits
+):
+    """Yield the translated records, prefetching their matches by chunk."""
+    try:
+        while True:
+            chunk = list(islice(translated_records, chunk_size))
+            if not chunk:
+                return
+
+            searches = []
+            for _, json_data, _, exc in chunk:
+                if exc is not None:
+                    continue
+                try:
+                    importer = importer_class(json_data, provider)
+                    searches += importer.document_importer.matching_searches()
+                except Exception:
+                    # the error is reported when the record is imported
+                    continue
+            identifiers_index = get_identifiers_index()
+            if identifiers_index is not None:
+                # matched locally, no need to search
+                searches = [
+                    (key, matching_search)
+                    for key, matching_search in searches
+                    if not identifiers_index.covers(key)
+                ]
+            deferred_indexer = get_deferred_indexer()
+            if deferred_indexer:
+                # records imported in the previous chunks must be searchable
+                deferred_indexer.ensure_indexed({key for key, _ in searches})
+            matches_cache = DocumentMatchesCache(max_hits)
+            matches_cache.prefetch(searches)
+            g.importer_document_matches_cache = matches_cache
+
+            yield from chunk
+    finally:
+        g.importer_document_matches_cache = None
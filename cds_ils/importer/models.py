@@ -8,10 +8,20 @@
 """Database models for importer."""
 
 import enum
-from datetime import datetime
-
+import json
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from celery import states
+from celery.result import AsyncResult
+from flask import current_app, g
 from invenio_db import db
-from sqlalchemy import Enum
+from sqlalchemy import Enum, func
+from sqlalchemy.orm.util import identity_key
+
+from cds_ils.importer.transaction import commit
 
 
 def _format_exception(exception):
@@ -117,8 +127,67 @@ class ImporterImportLog(db.Model):
     entries_count = db.Column(db.Integer, nullable=True)
     """Number of entries in source file."""
 
+    processed_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries processed so far."""
+
     ignore_missing_rules = db.Column(db.Boolean)
 
+    source_path = db.Column(db.String, nullable=True)
+    """Path of the stored source file, to resume the import."""
+
+    checkpoint_index = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries processed and committed at the last checkpoint."""
+
+    checkpoint_offset = db.Column(db.BigInteger, nullable=True)
+    """Byte offset in the source file of the first entry to resume from."""
+
+    checkpoint_time = db.Column(db.DateTime, nullable=True)
+    """Time of the last checkpoint, to tell the interrupted imports apart."""
+
+    fingerprint = db.Column(db.String(64), nullable=True, index=True)
+    """Checksum of the source file with the provider and the import options."""
+
+    rules_profile = db.Column(db.JSON, nullable=True)
+    """Translation rules profile report, when profiled."""
+
+    records_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entry logs."""
+
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries creating a document."""
+
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries updating a document."""
+
+    deleted_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries deleting a document."""
+
+    unchanged_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries skipped as unchanged since their last import."""
+
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries in error."""
+
+    partial_matches_count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of entries with partial matches, to review."""
+
+    @classmethod
+    def increment_counters(cls, import_id, counts):
+        """Add the counts of entry logs, atomically for concurrent imports."""
+        if not counts:
+            return
+        db.session.query(cls).filter(cls.id == import_id).update(
+            {
+                getattr(cls, counter): func.coalesce(getattr(cls, counter), 0) + count
+                for counter, count in counts.items()
+            },
+            synchronize_session=False,
+        )
+        # the counters are read again from the database
+        log = db.session.identity_map.get(identity_key(cls, import_id))
+        if log is not None:
+            db.session.expire(log, list(counts))
+
     @classmethod
     def create(cls, data):
         """Create a new task log."""
@@ -127,6 +196,20 @@ class ImporterImportLog(db.Model):
         db.session.commit()
         return log
 
+    @classmethod
+    def find_preview(cls, fingerprint, since):
+        """Return the latest successful import preview of a source, if any."""
+        return (
+            cls.query.filter(
+                cls.fingerprint == fingerprint,
+                cls.mode == ImporterMode.PREVIEW_IMPORT,
+                cls.status == ImporterTaskStatus.SUCCEEDED,
+                cls.start_time >= since,
+            )
+            .order_by(cls.id.desc())
+            .first()
+        )
+
     def is_running(self):
         """Check if the task is currently running."""
         return self.status == ImporterTaskStatus.RUNNING
@@ -135,6 +218,58 @@ class ImporterImportLog(db.Model):
         """Check if the task is currently running."""
         return self.status == ImporterTaskStatus.CANCELLED
 
+    def is_cancel_requested(self):
+        """Check if the task was cancelled meanwhile, without locking its row."""
+        status = (
+            db.session.query(ImporterImportLog.status)
+            .filter(ImporterImportLog.id == self.id)
+            .scalar()
+        )
+        if status != ImporterTaskStatus.CANCELLED:
+            return False
+        # read again, not to overwrite the status when finalized
+        db.session.expire(self, ["status"])
+        return True
+
+    def is_active(self):
+        """Check if the task of a running import is still alive.
+
+        The task is considered dead once its celery task is done, or when no
+        checkpoint was committed for ``CDS_ILS_IMPORTER_STALE_HOURS``.
+        """
+        if not self.is_running():
+            return False
+        if self.celery_task_id is not None:
+            state = AsyncResult(self.celery_task_id).state
+            if state in states.READY_STATES:
+                return False
+        stale_hours = current_app.config["CDS_ILS_IMPORTER_STALE_HOURS"]
+        last_activity = self.checkpoint_time or self.start_time
+        return datetime.now() - last_activity < timedelta(hours=stale_hours)
+
+    def is_resumable(self):
+        """Check if the task can be resumed from its last checkpoint."""
+        if self.source_path is None:
+            return False
+        if self.status in (ImporterTaskStatus.FAILED, ImporterTaskStatus.CANCELLED):
+            return True
+        # a running import is resumed only if it was interrupted
+        return self.is_running() and not self.is_active()
+
+    def set_resumed(self):
+        """Mark the task as running again from its last checkpoint."""
+        self.status = ImporterTaskStatus.RUNNING
+        self.end_time = None
+        self.message = None
+        self.checkpoint_time = datetime.now()
+        db.session.commit()
+
+    def set_checkpoint(self, index, offset):
+        """Set the checkpoint, committed with the entries processed so far."""
+        self.checkpoint_index = index
+        self.checkpoint_offset = offset
+        self.checkpoint_time = datetime.now()
+
     def finalize(self):
         """Finalize the import."""
         if self.is_running():
@@ -161,16 +296,102 @@ class ImporterImportLog(db.Model):
         self.end_time = datetime.now()
         db.session.commit()
 
-    def set_entries_count(self, entries):
+    def set_entries_count(self, entries_count):
         """Set logged entries count."""
-        self.entries_count = len(entries)
+        self.entries_count = entries_count
         db.session.commit()
 
+    def increment_processed_count(self, count=1):
+        """Count more processed entries, also by concurrent chunks."""
+        db.session.query(ImporterImportLog).filter(
+            ImporterImportLog.id == self.id
+        ).update(
+            {
+                ImporterImportLog.processed_count: func.coalesce(
+                    ImporterImportLog.processed_count, 0
+                )
+                + count
+            },
+            synchronize_session=False,
+        )
+        db.session.expire(self, ["processed_count"])
+        commit()
+
+
+ACTION_COUNTERS = {
+    "create": "created_count",
+    "update": "updated_count",
+    "delete": "deleted_count",
+    "unchanged": "unchanged_count",
+}
+"""Counter of the task log of each entry action."""
+
+
+def record_log_counters(data):
+    """Return the counters of the task log an entry log counts in."""
+    counters = ["records_count"]
+    if data.get("error"):
+        counters.append("error_count")
+    elif data.get("action") in ACTION_COUNTERS:
+        counters.append(ACTION_COUNTERS[data["action"]])
+    if data.get("partial_matches"):
+        counters.append("partial_matches_count")
+    return counters
+
+
+def _diff_json(base, json_data):
+    """Return the top-level changes turning ``base`` into ``json_data``."""
+    return {
+        "set": {
+            key: value
+            for key, value in json_data.items()
+            if key not in base or base[key] != value
+        },
+        "unset": [key for key in base if key not in json_data],
+    }
+
+
+def _patch_json(base, diff):
+    """Return ``base`` with the top-level changes of a diff applied."""
+    json_data = {key: value for key, value in base.items() if key not in diff["unset"]}
+    json_data.update(diff["set"])
+    return json_data
+
+
+def compact_report(data):
+    """Return an entry log with its report columns compressed together.
+
+    The document JSON is stored as a diff against the imported JSON, which
+    it mostly repeats.
+    """
+    report = {
+        field: data.pop(field)
+        for field in ImportRecordLog.HEAVY_FIELDS
+        if data.get(field) is not None
+    }
+    if not report:
+        return data
+    raw_json = report.get("raw_json")
+    document_json = report.get("document_json")
+    if isinstance(raw_json, dict) and isinstance(document_json, dict) and document_json:
+        report["document_json"] = _diff_json(raw_json, document_json)
+        report["document_json_diff"] = True
+    data["report_json"] = zlib.compress(
+        json.dumps(report, separators=(",", ":")).encode("utf-8")
+    )
+    return data
+
 
 class ImportRecordLog(db.Model):
     """Entry log of one imported record."""
 
     __tablename__ = "import_record_log"
+    __table_args__ = (
+        db.Index("idx_import_record_log_import_id_id", "import_id", "id"),
+    )
+
+    HEAVY_FIELDS = ("document_json", "document", "raw_json", "eitem", "series")
+    """Columns only loaded when the full entry logs are requested."""
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -197,17 +418,54 @@ class ImportRecordLog(db.Model):
     output_pid = db.Column(db.String, nullable=True)
     action = db.Column(db.String, nullable=True)
     partial_matches = db.Column(db.JSON, nullable=True)
+    match_revision_id = db.Column(db.Integer, nullable=True)
+    """Revision of the exactly matched document, when previewed."""
     eitem = db.Column(db.JSON, nullable=True)
     series = db.Column(db.JSON, nullable=True)
+    report_json = db.Column(db.LargeBinary, nullable=True)
+    """The compressed report columns, in compact storage mode."""
+
+    def get_report(self):
+        """Return the report columns, decompressed if stored compacted."""
+        if self.report_json is None:
+            return {field: getattr(self, field) for field in self.HEAVY_FIELDS}
+        report = json.loads(zlib.decompress(self.report_json))
+        if report.pop("document_json_diff", False):
+            report["document_json"] = _patch_json(
+                report["raw_json"], report["document_json"]
+            )
+        return {field: report.get(field) for field in self.HEAVY_FIELDS}
+
+    def get_report_field(self, field):
+        """Return one report column, decompressed if stored compacted."""
+        if self.report_json is None:
+            return getattr(self, field)
+        return self.get_report()[field]
 
     @classmethod
     def __create(cls, data):
-        """Create a new entry."""
+        """Create a new entry, or buffer it when record logs are buffered."""
+        if current_app.config["CDS_ILS_IMPORTER_COMPACT_REPORTS"]:
+            data = compact_report(data)
+        buffer = g.get("import_record_log_buffer")
+        if buffer is not None:
+            buffer.add(data)
+            return
         entry = cls(**data)
         db.session.add(entry)
-        db.session.commit()
+        ImporterImportLog.increment_counters(
+            data["import_id"], dict.fromkeys(record_log_counters(data), 1)
+        )
+        commit()
         return entry
 
+    @classmethod
+    def get_logged_entries(cls, import_id):
+        """Return the ids of the entry logs of a task, by entry recid."""
+        return dict(
+            db.session.query(cls.entry_recid, cls.id).filter(cls.import_id == import_id)
+        )
+
     @classmethod
     def create_success(cls, import_id, entry_recid, report):
         """Mark this record as successfully imported."""
@@ -230,3 +488,105 @@ class ImportRecordLog(db.Model):
                 **report,
             }
         )
+
+
+class ImportRecordHash(db.Model):
+    """Hash of the JSON last imported for each record of a provider."""
+
+    __tablename__ = "importer_record_hash"
+
+    provider = db.Column(db.String, primary_key=True)
+    provider_recid = db.Column(db.String, primary_key=True)
+    """The recid of the record in the provider catalogue."""
+
+    json_hash = db.Column(db.String(64), nullable=False)
+    """The hash of the translated JSON of the record."""
+
+    document_pid = db.Column(db.String, nullable=False)
+    """The document the record was imported to."""
+
+    updated = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=lambda: datetime.now(),
+        onupdate=lambda: datetime.now(),
+    )
+
+    @classmethod
+    def get(cls, provider, provider_recid):
+        """Return the hash of a provider record, if already imported."""
+        return db.session.get(cls, (provider, provider_recid))
+
+    @classmethod
+    def store(cls, provider, provider_recid, json_hash, document_pid):
+        """Store the hash of an imported provider record."""
+        db.session.merge(
+            cls(
+                provider=provider,
+                provider_recid=provider_recid,
+                json_hash=json_hash,
+                document_pid=document_pid,
+            )
+        )
+        commit()
+
+
+class ImportRecordLogBuffer(object):
+    """Buffer of record log entries, inserted together in bulk."""
+
+    def __init__(self, max_size, max_delay):
+        """Constructor."""
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.entries = []
+        self.last_flush = time.monotonic()
+
+    def add(self, data):
+        """Buffer an entry, flushing when the buffer is full or too old."""
+        self.entries.append(data)
+        is_full = len(self.entries) >= self.max_size
+        is_stale = time.monotonic() - self.last_flush >= self.max_delay
+        if is_full or is_stale:
+            self.flush()
+
+    def flush(self):
+        """Insert all buffered entries at once."""
+        if self.entries:
+            db.session.bulk_insert_mappings(ImportRecordLog, self.entries)
+            counts = {}
+            for data in self.entries:
+                import_counts = counts.setdefault(data["import_id"], {})
+                for counter in record_log_counters(data):
+                    import_counts[counter] = import_counts.get(counter, 0) + 1
+            for import_id, import_counts in counts.items():
+                ImporterImportLog.increment_counters(import_id, import_counts)
+            commit()
+        self.entries = []
+        self.last_flush = time.monotonic()
+
+
+def flush_record_logs():
+    """Insert the buffered record log entries, if any."""
+    buffer = g.get("import_record_log_buffer")
+    if buffer is not None:
+        buffer.flush()
+
+
+@contextmanager
+def buffered_record_logs(max_size, max_delay):
+    """Buffer the record log entries created in the block.
+
+    The remaining entries are always flushed when leaving the block, also
+    when the import is cancelled or fails.
+    """
+    if max_size <= 1:
+        yield
+        return
+
+    buffer = ImportRecordLogBuffer(max_size, max_delay)
+    g.import_record_log_buffer = buffer
+    try:
+        yield
+    finally:
+        g.import_record_log_buffer = None
+        buffer.flush()
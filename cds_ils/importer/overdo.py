@@ -7,23 +7,59 @@
 
 """CDS-ILS Overdo module."""
 
+import re
+
 from cds_dojson.overdo import Overdo
+from cds_dojson.utils import not_accessed_keys
 from dojson._compat import iteritems
 from dojson.errors import IgnoreKey, MissingRule
 from dojson.utils import GroupableOrderedDict
 
+from cds_ils.importer.profiler import get_rule_profiler
+
+LITERAL_KEY = re.compile(r"^\^?([0-9A-Za-z_]{3,5})$")
+
 
 class CdsIlsOverdo(Overdo):
     """Overwrite API of Overdo dojson class."""
 
     rectype = None
 
+    dispatch = None
+    """Rule of each MARC key, memoized after the first lookup."""
+
+    def build(self):
+        """Build the rules index and precompile the dispatch table.
+
+        The table is filled with the ignored keys and the keys of the rules
+        matching a single MARC key, the other keys are added on their first
+        lookup.
+        """
+        super().build()
+        self.dispatch = {}
+        keys = set(self.__class__.__ignore_keys__)
+        for pattern, _ in self.rules:
+            literal_key = LITERAL_KEY.match(pattern)
+            if literal_key:
+                keys.add(literal_key.group(1))
+        for key in keys:
+            self.resolve(key)
+
+    def resolve(self, key):
+        """Return the rule matching a MARC key."""
+        try:
+            return self.dispatch[key]
+        except KeyError:
+            result = self.dispatch[key] = self.index.query(key)
+            return result
+
     def do(
         self,
         blob,
         ignore_missing=True,
         exception_handlers=None,
         init_fields=None,
+        missing=None,
     ):
         """Translate blob values and instantiate new model instance.
 
@@ -38,6 +74,9 @@ class CdsIlsOverdo(Overdo):
         :param exception_handlers: Give custom exception handlers to take care
                                    of non-standard codes that are installation
                                    specific.
+        :param missing: Set collecting the keys of the blob which were not
+                        translated, as returned by ``missing``, in the same
+                        pass.
         """
         handlers = {IgnoreKey: None}
         handlers.update(exception_handlers or {})
@@ -63,14 +102,18 @@ class CdsIlsOverdo(Overdo):
         else:
             items = iteritems(blob)
 
+        profiler = get_rule_profiler()
         for key, value in items:
             try:
-                result = self.index.query(key)
+                result = self.resolve(key)
                 if not result:
                     raise MissingRule(key)
 
                 name, creator = result
-                data = creator(output, key, value)
+                if profiler is None:
+                    data = creator(output, key, value)
+                else:
+                    data = profiler.call(creator, output, key, value)
                 if getattr(creator, "__extend__", False):
                     existing = output.get(name, [])
                     existing.extend(data)
@@ -84,4 +127,12 @@ class CdsIlsOverdo(Overdo):
                         handler(exc, output, key, value, rectype=self.rectype)
                 else:
                     raise exc
+
+            if missing is not None:
+                missing.update(
+                    "{0}{1}".format(key, field) for field in not_accessed_keys(value)
+                )
+
+        if missing is not None:
+            missing.difference_update(self.__class__.__ignore_keys__)
         return output
@@ -6,19 +6,87 @@
 # the terms of the MIT License; see LICENSE file for more details.
 
 """CDS-ILS Importer xml parser module."""
+import re
+
 from flask import current_app
 from lxml import etree
 
+# opening record tag, with or without a namespace prefix
+RECORD_OPENING_TAG = re.compile(rb"<(?:[^\s<>/!?:]+:)?record[\s/>]")
+
+
+def iter_records(xml_file):
+    """Stream isolated records without building the whole document tree.
 
-def get_records_list(xml_file):
-    """Generate list of isolated records."""
-    record_tag_path = current_app.config["CDS_ILS_IMPORTER_RECORD_TAG"]
+    Each record is yielded as soon as its closing tag is parsed and it is
+    cleared, together with the already processed siblings, once the caller
+    asks for the next one. The yielded element must not be kept around.
+    """
+    record_tag = current_app.config["CDS_ILS_IMPORTER_STREAM_RECORD_TAG"]
 
-    root = etree.parse(xml_file).getroot()
-    # namespaced XMLs
-    for record in root.xpath(record_tag_path):
+    context = etree.iterparse(xml_file, events=("end",), tag=record_tag, huge_tree=True)
+    for _, record in context:
         yield record
 
+        record.clear()
+        # free the records already processed, still referenced by the root
+        parent = record.getparent()
+        if parent is not None:
+            while record.getprevious() is not None:
+                del parent[0]
+    del context
+
+
+def iter_record_offsets(xml_file, chunk_size=1024 * 1024):
+    """Yield the byte offsets of the records of a binary XML file.
+
+    The file is scanned in chunks for opening record tags, so no tree is
+    built and memory does not grow with the file size.
+    """
+    position = 0
+    tail = b""
+    while True:
+        chunk = xml_file.read(chunk_size)
+        if not chunk:
+            break
+        data = tail + chunk
+        # a tag never contains "<": keep the last, maybe incomplete, one
+        cut = data.rfind(b"<")
+        if cut == -1:
+            cut = len(data)
+        for match in RECORD_OPENING_TAG.finditer(data, 0, cut):
+            yield position + match.start()
+        position += cut
+        tail = data[cut:]
+    for match in RECORD_OPENING_TAG.finditer(tail):
+        yield position + match.start()
+
+
+class ResumedXMLFile(object):
+    """Binary XML file read from a record offset, keeping its header.
+
+    The bytes preceding the first record, the XML declaration and the
+    opening root tag with its namespaces, are read first, so that the
+    records from the offset on are parsed as in the whole file.
+    """
+
+    def __init__(self, xml_file, header_size, offset):
+        """Constructor."""
+        xml_file.seek(0)
+        self.header = xml_file.read(header_size)
+        xml_file.seek(offset)
+        self.xml_file = xml_file
+
+    def read(self, size=-1):
+        """Read the header first, then the file from the offset."""
+        if not self.header:
+            return self.xml_file.read(size)
+        if size < 0:
+            data, self.header = self.header + self.xml_file.read(), b""
+            return data
+        data, self.header = self.header[:size], self.header[size:]
+        return data
+
 
 def get_record_recid_from_xml(xml_record):
     """Get provider recid from the xml file."""
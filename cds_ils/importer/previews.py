@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer preview reuse module."""
+
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import g
+from invenio_app_ils.proxies import current_app_ils
+from invenio_db import db
+from invenio_pidstore.errors import PersistentIdentifierError
+from invenio_pidstore.models import PersistentIdentifier
+
+from cds_ils.importer.indexer import document_matching_keys
+from cds_ils.importer.models import ImporterImportLog, ImportRecordLog
+
+REUSABLE_ACTIONS = ("create", "update", "error")
+"""Actions of the previewed entries which can be imported as previewed."""
+
+PREVIEW_PID = "preview"
+"""Pid of the previewed documents, when no document is matched."""
+
+
+def fingerprint_source(source_path, provider, ignore_missing_rules):
+    """Return the fingerprint of a source file, with its import options."""
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    digest.update("|{0}|{1}".format(provider, bool(ignore_missing_rules)).encode())
+    return digest.hexdigest()
+
+
+def documents_changed_since(start_time):
+    """Check if any document was created or updated since the given time."""
+    model_cls = current_app_ils.document_record_cls.model_cls
+    document_pid_type = current_app_ils.document_record_cls._pid_type
+    query = db.session.query(PersistentIdentifier.id).join(
+        model_cls, model_cls.id == PersistentIdentifier.object_uuid
+    )
+    return db.session.query(
+        query.filter(
+            PersistentIdentifier.pid_type == document_pid_type,
+            model_cls.updated >= start_time,
+        ).exists()
+    ).scalar()
+
+
+class PreviewReuse(object):
+    """Translated JSON and match decisions of a preview of the same source.
+
+    The translated JSON of the previewed entries is always reused. Their
+    match decisions are reused unless a document was changed since the
+    preview, the matched document has a new revision, or a document sharing
+    the matching keys of the entry was imported earlier in this run.
+    """
+
+    def __init__(self, preview_log, reuse_matches=True):
+        """Constructor."""
+        self.preview_log = preview_log
+        self.reuse_matches = reuse_matches
+        self.entries = self._load_entries()
+        self.changed_keys = set()
+        self.translated_count = 0
+        self.matched_count = 0
+
+    def _load_entries(self):
+        """Return the ids of the reusable preview entry logs, by recid."""
+        entries, duplicated = {}, set()
+        query = db.session.query(
+            ImportRecordLog.entry_recid, ImportRecordLog.id
+        ).filter(
+            ImportRecordLog.import_id == self.preview_log.id,
+            ImportRecordLog.error.is_(None),
+            ImportRecordLog.action.in_(REUSABLE_ACTIONS),
+        )
+        for entry_recid, entry_id in query:
+            if entry_recid in entries:
+                duplicated.add(entry_recid)
+            entries[entry_recid] = entry_id
+        # the entries of a recid present more than once cannot be told apart
+        for entry_recid in duplicated:
+            del entries[entry_recid]
+        return entries
+
+    def get_entry(self, entry_recid):
+        """Return the preview entry log of a record, if any."""
+        entry_id = self.entries.get(entry_recid)
+        if entry_id is None:
+            return None
+        return db.session.get(ImportRecordLog, entry_id)
+
+    def translated(self, entry_recid):
+        """Return the previewed JSON of a record, if any."""
+        entry = self.get_entry(entry_recid)
+        if entry is None:
+            return None
+        json_data = entry.get_report_field("raw_json")
+        if json_data:
+            self.translated_count += 1
+        return json_data
+
+    def match(self, entry_recid, json_data):
+        """Return the previewed exact and partial matches, if still valid."""
+        if not self.reuse_matches:
+            return None
+        entry = self.get_entry(entry_recid)
+        if entry is None or document_matching_keys(json_data) & self.changed_keys:
+            return None
+
+        exact_match = None
+        if entry.output_pid != PREVIEW_PID:
+            if entry.match_revision_id is None:
+                # the revision of the matched document is unknown
+                return None
+            exact_match = entry.output_pid
+            try:
+                document = current_app_ils.document_record_cls.get_record_by_pid(
+                    exact_match
+                )
+            except PersistentIdentifierError:
+                return None
+            if document.revision_id != entry.match_revision_id:
+                return None
+        self.matched_count += 1
+        return exact_match, entry.partial_matches or []
+
+    def invalidate(self, keys):
+        """Stop reusing the matches of the entries sharing these keys."""
+        self.changed_keys |= keys
+
+
+def find_preview_reuse(fingerprint, max_age_hours):
+    """Return the reusable results of a recent preview of the same source."""
+    preview_log = ImporterImportLog.find_preview(
+        fingerprint, datetime.now() - timedelta(hours=max_age_hours)
+    )
+    if preview_log is None:
+        return None
+    return PreviewReuse(
+        preview_log,
+        reuse_matches=not documents_changed_since(preview_log.start_time),
+    )
+
+
+def get_preview_reuse():
+    """Return the reused results of the preview of the import, if any."""
+    return g.get("importer_preview_reuse")
+
+
+@contextmanager
+def reusing_preview(preview_reuse):
+    """Reuse the results of a preview for the records imported in the block."""
+    g.importer_preview_reuse = preview_reuse
+    try:
+        yield preview_reuse
+    finally:
+        g.importer_preview_reuse = None
+
+
+@contextmanager
+def importing_entry(entry_recid):
+    """Mark the entry whose record is imported in the block."""
+    g.importer_entry_recid = entry_recid
+    try:
+        yield
+    finally:
+        g.importer_entry_recid = None
+
+
+def get_previewed_match(json_data):
+    """Return the previewed matches of the imported record, if reusable."""
+    preview_reuse = get_preview_reuse()
+    entry_recid = g.get("importer_entry_recid")
+    if preview_reuse is None or entry_recid is None:
+        return None
+    return preview_reuse.match(entry_recid, json_data)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer translation rules profiler module."""
+
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+
+
+class RuleProfiler(object):
+    """Calls, time and exceptions of each translation rule, by MARC key."""
+
+    def __init__(self):
+        """Constructor."""
+        self.stats = {}
+
+    def call(self, creator, output, key, value):
+        """Run a rule, recording its duration and if it raised."""
+        stats = self.stats.get((key, creator))
+        if stats is None:
+            stats = self.stats[(key, creator)] = [0, 0.0, 0]
+        stats[0] += 1
+        started = time.perf_counter()
+        try:
+            return creator(output, key, value)
+        except Exception:
+            stats[2] += 1
+            raise
+        finally:
+            stats[1] += time.perf_counter() - started
+
+    def report(self):
+        """Return the stats of the rules, by decreasing cumulative time."""
+        rows = [
+            {
+                "key": key,
+                "rule": "{0}.{1}".format(creator.__module__, creator.__name__),
+                "calls": calls,
+                "time": cumulative_time,
+                "exceptions": exceptions,
+            }
+            for (key, creator), (calls, cumulative_time, exceptions) in (
+                self.stats.items()
+            )
+        ]
+        return sorted(rows, key=lambda row: row["time"], reverse=True)
+
+    def format_report(self, limit=None):
+        """Return the report as a text table."""
+        lines = [
+            "{0:<8} {1:<70} {2:>8} {3:>10} {4:>10}".format(
+                "key", "rule", "calls", "time (s)", "exceptions"
+            )
+        ]
+        for row in self.report()[:limit]:
+            lines.append(
+                "{key:<8} {rule:<70} {calls:>8} {time:>10.4f} {exceptions:>10}".format(
+                    **row
+                )
+            )
+        return "\n".join(lines)
+
+
+def get_rule_profiler():
+    """Return the rule profiler of the current import, if any."""
+    if not has_app_context():
+        # the rules are also run outside of the application
+        return None
+    return g.get("importer_rule_profiler")
+
+
+@contextmanager
+def profiling_rules(enabled):
+    """Profile the translation rules run in the block."""
+    if not enabled:
+        yield None
+        return
+
+    profiler = RuleProfiler()
+    g.importer_rule_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        g.importer_rule_profiler = None
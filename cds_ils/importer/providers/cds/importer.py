@@ -31,6 +31,8 @@ class CDSImporter(Importer):
     # Mark all CDS elated E-Items as login required and not open access
     EITEM_OPEN_ACCESS = False
     EITEM_URLS_LOGIN_REQUIRED = True
+    # documents are matched by legacy recid, not searched
+    BATCH_MATCHING = False
 
     def _match_document(self):
         """CDS importer match document."""
@@ -41,11 +41,14 @@ class CDSMultipart(CdsIlsOverdo):
         ignore_missing=True,
         exception_handlers=None,
         init_fields=None,
+        **kwargs,
     ):
         """Overwrite the do method."""
         self._default_fields["_migration"]["record_type"] = "multipart"
         init_fields = deepcopy(self._default_fields)
-        return super().do(blob, ignore_missing, exception_handlers, init_fields)
+        return super().do(
+            blob, ignore_missing, exception_handlers, init_fields, **kwargs
+        )
 
 
 model = CDSMultipart(
@@ -33,10 +33,13 @@ class CDSStandard(CdsIlsOverdo):
         ignore_missing=True,
         exception_handlers=None,
         init_fields=None,
+        **kwargs,
     ):
         """Overwrite the do method."""
         init_fields = deepcopy(self._default_fields)
-        return super().do(blob, ignore_missing, exception_handlers, init_fields)
+        return super().do(
+            blob, ignore_missing, exception_handlers, init_fields, **kwargs
+        )
 
 
 model = CDSStandard(
@@ -1597,6 +1597,28 @@ EXTERNAL_SYSTEM_IDENTIFIERS_TO_IGNORE = [
 ]
 
 
+# lookup tables of the maps, by map id
+COMPILED_MAPPINGS = {}
+
+
+def compile_mapping(field_map):
+    """Compile a map into a lookup table used by ``mapping``.
+
+    Dict maps are inverted into a value to key dict, keeping the first key
+    of a value, and list maps are turned into frozensets.
+    """
+    if isinstance(field_map, dict):
+        if not all(isinstance(v, list) for v in field_map.values()):
+            return
+        table = {}
+        for k, v in field_map.items():
+            for value in v:
+                table.setdefault(value, k)
+        COMPILED_MAPPINGS[id(field_map)] = table
+    elif isinstance(field_map, list):
+        COMPILED_MAPPINGS[id(field_map)] = frozenset(field_map)
+
+
 def mapping(field_map, val, raise_exception=False, default_val=None, subfield=None):
     """
     Maps the old value to a new one according to the map.
@@ -1613,14 +1635,43 @@ def mapping(field_map, val, raise_exception=False, default_val=None, subfield=No
     if isinstance(val, str):
         val = val.strip()
     if val:
+        table = COMPILED_MAPPINGS.get(id(field_map))
         if isinstance(field_map, dict):
-            for k, v in field_map.items():
-                if val.upper() in v:
+            if table is not None:
+                k = table.get(val.upper())
+                if k is not None:
                     return k
+            else:
+                for k, v in field_map.items():
+                    if val.upper() in v:
+                        return k
         elif isinstance(field_map, list):
-            if val in field_map:
+            if table is not None and isinstance(val, str):
+                if val in table:
+                    return val
+            elif val in field_map:
                 return val
         if default_val:
             return default_val
         if raise_exception:
             raise UnexpectedValue(subfield=subfield)
+
+
+for _field_map in (
+    DOCUMENT_TYPE,
+    COLLECTION,
+    TAGS_TO_IGNORE,
+    SERIAL,
+    ACQUISITION_METHOD,
+    ACCESS_TYPE,
+    ITEMS_MEDIUMS,
+    MATERIALS,
+    IDENTIFIERS_MEDIUM_TYPES,
+    EDITIONS,
+    APPLICABILITY,
+    EXPERIMENTS,
+    ARXIV_CATEGORIES,
+    EXTERNAL_SYSTEM_IDENTIFIERS,
+    EXTERNAL_SYSTEM_IDENTIFIERS_TO_IGNORE,
+):
+    compile_mapping(_field_map)
@@ -39,12 +39,13 @@ class SafariModel(Base):
         ignore_missing=True,
         exception_handlers=None,
         init_fields=None,
+        **kwargs,
     ):
         """Overwrite the do method."""
         fields = deepcopy(self._default_fields)
         if init_fields:
             fields.update(init_fields)
-        mapped = super().do(blob, ignore_missing, exception_handlers, fields)
+        mapped = super().do(blob, ignore_missing, exception_handlers, fields, **kwargs)
         return self._add_missing_fields(mapped)
 
 
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer records loading module."""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g
+from invenio_db import db
+from invenio_pidstore.models import PersistentIdentifier, PIDStatus
+
+
+class DocumentsCache(object):
+    """Documents recently loaded by an import, by pid.
+
+    The least recently used documents are evicted once ``max_size`` of them
+    are cached. The documents imported in the same run are invalidated.
+    """
+
+    def __init__(self, max_size):
+        """Constructor."""
+        self.max_size = max_size
+        self.documents = OrderedDict()
+
+    def __len__(self):
+        """Return the number of cached documents."""
+        return len(self.documents)
+
+    def get(self, pid_value):
+        """Return a cached document, if any."""
+        document = self.documents.get(pid_value)
+        if document is not None:
+            self.documents.move_to_end(pid_value)
+        return document
+
+    def add(self, pid_value, document):
+        """Cache a document, evicting the least recently used one if full."""
+        self.documents[pid_value] = document
+        self.documents.move_to_end(pid_value)
+        if len(self.documents) > self.max_size:
+            self.documents.popitem(last=False)
+
+    def invalidate(self, pid_value):
+        """Remove a document from the cache."""
+        self.documents.pop(pid_value, None)
+
+
+def get_documents_cache():
+    """Return the documents cache of the current import, if any."""
+    return g.get("importer_documents_cache")
+
+
+@contextmanager
+def cached_documents(max_size):
+    """Cache the documents loaded when matching the records of the block."""
+    if not max_size:
+        yield
+        return
+
+    g.importer_documents_cache = DocumentsCache(max_size)
+    try:
+        yield
+    finally:
+        g.importer_documents_cache = None
+
+
+def get_records_by_pids(record_cls, pid_values, cache=None):
+    """Return the records of the pids, in their order.
+
+    The pids missing from the cache are resolved in one query and their
+    records fetched in another one. The pids which cannot be resolved are
+    fetched one by one, raising the same errors as before.
+    """
+    records = {}
+    for pid_value in pid_values:
+        record = cache.get(pid_value) if cache is not None else None
+        if record is not None:
+            records[pid_value] = record
+
+    missing = [pid_value for pid_value in pid_values if pid_value not in records]
+    if missing:
+        pids = dict(
+            db.session.query(
+                PersistentIdentifier.object_uuid, PersistentIdentifier.pid_value
+            ).filter(
+                PersistentIdentifier.pid_type == record_cls._pid_type,
+                PersistentIdentifier.pid_value.in_(set(missing)),
+                PersistentIdentifier.object_type == "rec",
+                PersistentIdentifier.status == PIDStatus.REGISTERED,
+            )
+        )
+        for record in record_cls.get_records(list(pids)):
+            records[pids[record.id]] = record
+        if cache is not None:
+            for pid_value in dict.fromkeys(missing):
+                if pid_value in records:
+                    cache.add(pid_value, records[pid_value])
+
+    return [
+        records[pid_value]
+        if pid_value in records
+        else record_cls.get_record_by_pid(pid_value)
+        for pid_value in pid_values
+    ]
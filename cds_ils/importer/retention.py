@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer logs retention module."""
+
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from invenio_db import db
+from sqlalchemy import func, literal, literal_column
+
+from cds_ils.importer.models import (
+    ImporterImportLog,
+    ImporterMode,
+    ImporterTaskStatus,
+    ImportRecordLog,
+)
+from cds_ils.importer.serializers.schema import ImporterTaskLogV1
+
+
+def _row_size(model):
+    """Return the expression of the size of a row, on Postgres only."""
+    if db.session.get_bind().dialect.name != "postgresql":
+        return literal(0)
+    return func.pg_column_size(literal_column("{0}.*".format(model.__tablename__)))
+
+
+def expired_logs(retention, now=None):
+    """Return the ids of the finished task logs past their retention.
+
+    The retention of each mode is a number of days, or ``None`` to keep the
+    task logs of the mode forever. The running task logs are pruned too once
+    they are no longer active, without checkpoint for
+    ``CDS_ILS_IMPORTER_STALE_HOURS``.
+    """
+    now = now or datetime.now()
+    stale_hours = current_app.config["CDS_ILS_IMPORTER_STALE_HOURS"]
+    last_activity = func.coalesce(
+        ImporterImportLog.checkpoint_time, ImporterImportLog.start_time
+    )
+    expired = []
+    for mode, days in retention.items():
+        if days is None:
+            continue
+        expired.append(
+            db.and_(
+                ImporterImportLog.mode == ImporterMode(mode),
+                ImporterImportLog.start_time < now - timedelta(days=days),
+            )
+        )
+    if not expired:
+        return []
+    query = (
+        db.session.query(ImporterImportLog.id)
+        .filter(
+            db.or_(*expired),
+            db.or_(
+                ImporterImportLog.status != ImporterTaskStatus.RUNNING,
+                last_activity < now - timedelta(hours=stale_hours),
+            ),
+        )
+        .order_by(ImporterImportLog.id.asc())
+    )
+    return [log_id for log_id, in query]
+
+
+def archive_log(log, archive_path):
+    """Append the summary of a task log to the archive, in JSON lines."""
+    with open(archive_path, "a") as archive:
+        archive.write(json.dumps(ImporterTaskLogV1().dump(log)) + "\n")
+
+
+def prune_log(log_id, batch_size):
+    """Delete a task log and its entry logs, in short transactions.
+
+    The entry logs are deleted by batches of ``batch_size`` rows, each batch
+    committed before the next one, so that the tables are never locked for
+    long. Returns the number of rows and bytes deleted.
+    """
+    rows, size = 0, 0
+    while True:
+        batch = (
+            db.session.query(ImportRecordLog.id, _row_size(ImportRecordLog))
+            .filter(ImportRecordLog.import_id == log_id)
+            .order_by(ImportRecordLog.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        db.session.query(ImportRecordLog).filter(
+            ImportRecordLog.id.in_([entry_id for entry_id, _ in batch])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        rows += len(batch)
+        size += sum(entry_size or 0 for _, entry_size in batch)
+
+    log_size = (
+        db.session.query(_row_size(ImporterImportLog))
+        .filter(ImporterImportLog.id == log_id)
+        .scalar()
+    )
+    db.session.query(ImporterImportLog).filter(ImporterImportLog.id == log_id).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return rows + 1, size + (log_size or 0)
+
+
+def prune_import_logs(retention, batch_size, archive_path=None, now=None):
+    """Delete the task logs past their retention, with their entry logs.
+
+    The summary of each task log is archived first, when an archive path is
+    given. Returns the number of task logs, rows and bytes reclaimed.
+    """
+    report = dict(logs=0, rows=0, bytes=0)
+    for log_id in expired_logs(retention, now=now):
+        if archive_path:
+            archive_log(db.session.get(ImporterImportLog, log_id), archive_path)
+        rows, size = prune_log(log_id, batch_size)
+        report["logs"] += 1
+        report["rows"] += rows
+        report["bytes"] += size
+    return report
@@ -20,10 +20,12 @@ def importer_task_responsify(schema_class, mimetype):
     :param mimetype: MIME type of response.
     """
 
-    def view(data, code=200, headers=None, record_offset=0):
+    def view(data, code=200, headers=None, record_offset=0, **kwargs):
         """Generate the response object."""
         if isinstance(data, ImporterImportLog):
-            response_data = schema_class(record_offset=record_offset).dump(data)
+            response_data = schema_class(record_offset=record_offset, **kwargs).dump(
+                data
+            )
 
             response = current_app.response_class(
                 json.dumps(response_data), mimetype=mimetype
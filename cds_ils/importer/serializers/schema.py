@@ -10,7 +10,8 @@
 from invenio_app_ils.documents.loaders import DocumentSchemaV1
 from invenio_app_ils.eitems.loaders import EItemSchemaV1
 from invenio_app_ils.series.loaders import SeriesSchemaV1
-from marshmallow import EXCLUDE, Schema, fields, post_dump, types
+from marshmallow import EXCLUDE, Schema, fields, post_dump, pre_dump, types
+from sqlalchemy.orm import defer
 
 from cds_ils.importer.models import ImportRecordLog
 
@@ -81,6 +82,22 @@ class ImporterRecordReportSchemaV1(Schema):
 
         unknown = EXCLUDE
 
+    @pre_dump
+    def decode_report(self, record_log, **kwargs):
+        """Decompress the compacted report columns, only when dumped."""
+        if not isinstance(record_log, ImportRecordLog):
+            return record_log
+        if not set(ImportRecordLog.HEAVY_FIELDS) & set(self.fields):
+            return record_log
+        if record_log.report_json is None:
+            return record_log
+        data = {
+            column.key: getattr(record_log, column.key)
+            for column in ImportRecordLog.__table__.columns
+        }
+        data.update(record_log.get_report())
+        return data
+
     @post_dump
     def status(self, data, **kwargs):
         """Return correct status."""
@@ -102,6 +119,15 @@ class ImporterTaskLogV1(Schema):
     mode = fields.String(dump_only=True)
     source_type = fields.String(dump_only=True)
     entries_count = fields.Number(dump_only=True)
+    processed_count = fields.Number(dump_only=True)
+    rules_profile = fields.List(fields.Dict(), dump_only=True)
+    records_count = fields.Number(dump_only=True)
+    created_count = fields.Number(dump_only=True)
+    updated_count = fields.Number(dump_only=True)
+    deleted_count = fields.Number(dump_only=True)
+    unchanged_count = fields.Number(dump_only=True)
+    error_count = fields.Number(dump_only=True)
+    partial_matches_count = fields.Number(dump_only=True)
 
     class Meta:
         """Meta attributes for the schema."""
@@ -110,11 +136,20 @@ class ImporterTaskLogV1(Schema):
 
 
 class ImporterTaskDetailLogV1(ImporterTaskLogV1):
-    """Importer task detail log schema."""
+    """Importer task detail log schema.
+
+    Without an ``after`` cursor, all the entry logs from the
+    ``record_offset`` entry are dumped. With it, the entry logs are
+    paginated by their ids, by pages of at most ``size`` entries, and
+    unless ``full`` their JSON columns are not loaded.
+    """
 
-    def __init__(self, record_offset, **kwargs):
+    def __init__(self, record_offset=0, after=None, size=100, full=True, **kwargs):
         """Constructor."""
         self.records_offset = record_offset
+        self.after = after
+        self.size = size
+        self.full = full
         super().__init__(**kwargs)
 
     @post_dump
@@ -124,6 +159,12 @@ class ImporterTaskDetailLogV1(ImporterTaskLogV1):
             import_id=data.get("id")
         ).order_by(ImportRecordLog.id.asc())
 
+        if self.after is None:
+            return self._dump_from_offset(data, children_entries_query)
+        return self._dump_page(data, children_entries_query)
+
+    def _dump_from_offset(self, data, children_entries_query):
+        """Dump all the entry logs from the offset."""
         first_entry = children_entries_query.first()
 
         initial_id = 0
@@ -131,15 +172,36 @@ class ImporterTaskDetailLogV1(ImporterTaskLogV1):
         if first_entry:
             initial_id = first_entry.id
 
-        entries = (
-            children_entries_query.filter(
-                ImportRecordLog.id >= initial_id + self.records_offset
-            )
-            .order_by(ImportRecordLog.id.asc())
-            .all()
-        )
+        entries = children_entries_query.filter(
+            ImportRecordLog.id >= initial_id + self.records_offset
+        ).all()
 
         data["loaded_entries"] = children_entries_query.count()
         data["records"] = ImporterRecordReportSchemaV1(many=True).dump(entries)
 
         return data
+
+    def _dump_page(self, data, children_entries_query):
+        """Dump a page of entry logs after the cursor."""
+        entries_query = children_entries_query.filter(ImportRecordLog.id > self.after)
+        if not self.full:
+            entries_query = entries_query.options(
+                *(
+                    defer(getattr(ImportRecordLog, field))
+                    for field in ImportRecordLog.HEAVY_FIELDS
+                ),
+                defer(ImportRecordLog.report_json),
+            )
+        entries = entries_query.limit(self.size + 1).all()
+        has_more = len(entries) > self.size
+        entries = entries[: self.size]
+
+        exclude = () if self.full else ImportRecordLog.HEAVY_FIELDS
+        data["records"] = ImporterRecordReportSchemaV1(many=True, exclude=exclude).dump(
+            entries
+        )
+        data["loaded_entries"] = data.get("records_count")
+        data["next_cursor"] = entries[-1].id if entries else self.after
+        data["has_more"] = has_more
+
+        return data
@@ -17,7 +17,6 @@ from invenio_app_ils.proxies import current_app_ils
 from invenio_app_ils.records_relations.api import RecordRelationsParentChild
 from invenio_app_ils.relations.api import Relation
 from invenio_app_ils.series.api import SeriesIdProvider
-from invenio_db import db
 
 from cds_ils.importer.errors import SeriesImportError
 from cds_ils.importer.providers.utils import rreplace
@@ -26,6 +25,7 @@ from cds_ils.importer.series.api import (
     search_series_by_issn,
     search_series_by_title,
 )
+from cds_ils.importer.transaction import commit, rollback
 from cds_ils.importer.vocabularies_validator import validator as vocabulary_validator
 
 VOCABULARIES_FIELDS = {
@@ -131,11 +131,11 @@ class SeriesImporter(object):
         )
         try:
             matched_series.commit()
-            db.session.commit()
+            commit()
         except IlsValidationError as e:
             click.secho("Field: {}".format(e.errors[0].res["field"]), fg="red")
             click.secho(e.original_exception.message, fg="red")
-            db.session.rollback()
+            rollback()
             raise e
 
     def create_series(self, json_series):
@@ -152,12 +152,12 @@ class SeriesImporter(object):
 
         try:
             series = series_class.create(cleaned_json, record_uuid)
-            db.session.commit()
+            commit()
             return series
         except IlsValidationError as e:
             click.secho("Field: {}".format(e.errors[0].res["field"]), fg="red")
             click.secho(e.original_exception.message, fg="red")
-            db.session.rollback()
+            rollback()
             raise e
 
     def search_for_matching_series(self, json_series):
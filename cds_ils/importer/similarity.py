@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer local similarity matching module."""
+
+import math
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+
+from flask import current_app, g
+from invenio_app_ils.proxies import current_app_ils
+
+SimilarDocument = namedtuple("SimilarDocument", ["pid", "score"])
+"""A document similar to an imported record, with its similarity score."""
+
+
+def _normalize(text):
+    """Return a lower case text of words, without punctuation."""
+    return " ".join(re.sub(r"[^\w]+", " ", (text or "").lower()).split())
+
+
+def title_trigrams(title):
+    """Return the character trigrams of a normalized title."""
+    title = " {0} ".format(_normalize(title))
+    return {title[index : index + 3] for index in range(len(title) - 2)}
+
+
+def author_tokens(authors):
+    """Return the normalized name words of the authors."""
+    return {token for author in authors for token in _normalize(author).split()}
+
+
+class SimilarityIndex(object):
+    """Trigrams of the titles of the catalogue documents, with their authors.
+
+    The index is loaded once per import from the documents index and kept up
+    to date with the documents imported in the same run. A document is
+    similar to a record when the trigram Jaccard similarity of their titles
+    reaches the threshold and they share an author name. Only the documents
+    sharing one of the rarest trigrams of the title can reach the threshold,
+    the other documents are never compared.
+    """
+
+    def __init__(self, threshold):
+        """Constructor."""
+        self.threshold = threshold
+        self.gram_ids = {}
+        self.postings = {}
+        self.documents = {}
+
+    def __len__(self):
+        """Return the number of indexed documents."""
+        return len(self.documents)
+
+    def _gram_ids(self, grams, create=False):
+        """Return the ids of the trigrams, skipping the unknown ones."""
+        ids = []
+        for gram in grams:
+            gram_id = self.gram_ids.get(gram)
+            if gram_id is None and create:
+                gram_id = self.gram_ids[gram] = len(self.gram_ids)
+            if gram_id is not None:
+                ids.append(gram_id)
+        return ids
+
+    def load(self):
+        """Load the titles and authors of all the catalogue documents."""
+        document_search = current_app_ils.document_search_cls()
+        documents = document_search.source(["pid", "title", "authors.full_name"])
+        for document in documents.scan():
+            self.add(document.to_dict())
+        return self
+
+    def add(self, document):
+        """Index the title and authors of a document."""
+        pid = document["pid"]
+        if pid in self.documents:
+            self.remove(document)
+        gram_ids = frozenset(
+            self._gram_ids(title_trigrams(document.get("title")), create=True)
+        )
+        authors = [author.get("full_name") for author in document.get("authors", [])]
+        self.documents[pid] = (gram_ids, frozenset(author_tokens(authors)))
+        for gram_id in gram_ids:
+            self.postings.setdefault(gram_id, set()).add(pid)
+
+    def remove(self, document):
+        """Remove a document from the index."""
+        gram_ids, _ = self.documents.pop(document["pid"], ((), ()))
+        for gram_id in gram_ids:
+            self.postings[gram_id].discard(document["pid"])
+
+    def search(self, title, authors, max_hits=None):
+        """Return the documents similar to a record, most similar first.
+
+        All the similar documents are returned when ``max_hits`` is not set.
+        """
+        grams = title_trigrams(title)
+        tokens = author_tokens(authors)
+        if not grams or not tokens:
+            return []
+
+        # a similar document shares one of the rarest trigrams of the title
+        gram_ids = sorted(
+            self._gram_ids(grams), key=lambda gram_id: len(self.postings[gram_id])
+        )
+        prefix_length = len(grams) - math.ceil(self.threshold * len(grams)) + 1
+        # the trigrams unknown to the index are shared by no document
+        prefix_length -= len(grams) - len(gram_ids)
+        candidates = set()
+        for gram_id in gram_ids[: max(prefix_length, 0)]:
+            candidates |= self.postings[gram_id]
+
+        query_ids = frozenset(gram_ids)
+        matches = []
+        for pid in candidates:
+            document_ids, document_tokens = self.documents[pid]
+            if not tokens & document_tokens:
+                continue
+            shared = len(query_ids & document_ids)
+            score = shared / (len(grams) + len(document_ids) - shared)
+            if score >= self.threshold:
+                matches.append(SimilarDocument(pid, score))
+        matches.sort(key=lambda match: (-match.score, match.pid))
+        return matches[:max_hits] if max_hits else matches
+
+
+def get_similarity_index():
+    """Return the similarity index of the current import, if any."""
+    return g.get("importer_similarity_index")
+
+
+@contextmanager
+def preloaded_similarity_index(enabled):
+    """Match the similar documents of the records imported in the block locally."""
+    if not enabled:
+        yield
+        return
+
+    similarity_index = SimilarityIndex(
+        current_app.config["CDS_ILS_IMPORTER_SIMILARITY_THRESHOLD"]
+    ).load()
+    current_app.logger.info(
+        "Importer similarity index loaded: {0} documents, {1} trigrams".format(
+            len(similarity_index), len(similarity_index.gram_ids)
+        )
+    )
+    g.importer_similarity_index = similarity_index
+    try:
+        yield
+    finally:
+        g.importer_similarity_index = None
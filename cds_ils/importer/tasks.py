@@ -6,14 +6,18 @@
 # the terms of the MIT License; see LICENSE file for more details.
 
 """CDS-ILS Importer tasks."""
-import datetime
-
-from celery import shared_task
+from celery import chord, shared_task
+from flask import current_app
 from invenio_db import db
-from sqlalchemy import or_
 
-from cds_ils.importer.api import import_from_xml
-from cds_ils.importer.models import ImporterAgent, ImporterImportLog, ImporterMode
+from cds_ils.importer.api import (
+    finalize_chunked_import,
+    import_chunk_from_xml,
+    import_from_xml,
+)
+from cds_ils.importer.models import ImporterAgent, ImporterImportLog
+from cds_ils.importer.parse_xml import iter_record_offsets
+from cds_ils.importer.retention import prune_import_logs
 
 
 def create_import_task(
@@ -33,10 +37,60 @@ def create_import_task(
             mode=mode,
             original_filename=original_filename,
             ignore_missing_rules=ignore_missing_rules,
+            source_path=source_path,
         )
     )
+    chunk_size = current_app.config["CDS_ILS_IMPORTER_TASK_CHUNK_SIZE"]
+    entries_count, chunk_offsets = 0, []
+    if chunk_size:
+        with open(source_path, "rb") as source:
+            for entries_count, offset in enumerate(iter_record_offsets(source), 1):
+                if (entries_count - 1) % chunk_size == 0:
+                    chunk_offsets.append(offset)
+
+    if len(chunk_offsets) > 1:
+        log.set_entries_count(entries_count)
+        # the header of the file, with the root tag, is parsed by each chunk
+        header_size = chunk_offsets[0]
+        chunk_tasks = [
+            import_chunk_task.si(
+                log.id,
+                source_path,
+                source_type,
+                provider,
+                mode,
+                header_size,
+                offset,
+                min(chunk_size, entries_count - index * chunk_size),
+                ignore_missing_rules,
+            )
+            for index, offset in enumerate(chunk_offsets)
+        ]
+        async_result = chord(chunk_tasks)(finalize_chunked_import_task.s(log.id))
+    else:
+        async_result = import_from_xml_task.apply_async(
+            (log.id, source_path, source_type, provider, mode, ignore_missing_rules)
+        )
+
+    log.celery_task_id = async_result.id
+    db.session.commit()
+
+    return log
+
+
+def resume_import_task(log):
+    """Resumes an interrupted task from its last checkpoint."""
+    log.set_resumed()
     async_result = import_from_xml_task.apply_async(
-        (log.id, source_path, source_type, provider, mode, ignore_missing_rules)
+        (
+            log.id,
+            log.source_path,
+            log.source_type,
+            log.provider,
+            log.mode.value,
+            log.ignore_missing_rules,
+        ),
+        kwargs=dict(resume=True),
     )
 
     log.celery_task_id = async_result.id
@@ -47,26 +101,67 @@ def create_import_task(
 
 @shared_task
 def import_from_xml_task(
-    log_id, source_path, source_type, provider, mode, ignore_missing_rules
+    log_id, source_path, source_type, provider, mode, ignore_missing_rules, resume=False
 ):
     """Load a single xml file task."""
     log = ImporterImportLog.query.get(log_id)
-    import_from_xml(log, source_path, source_type, provider, mode, ignore_missing_rules)
+    import_from_xml(
+        log,
+        source_path,
+        source_type,
+        provider,
+        mode,
+        ignore_missing_rules,
+        resume=resume,
+    )
 
 
 @shared_task
-def clean_preview_logs():
-    """Clean stale preview logs."""
-    # take tasks older than 7 days
-    seven_days_ago = datetime.datetime.now() - datetime.timedelta(days=7)
-
-    # find and delete all the stale preview logs
-    ImporterImportLog.query.filter(
-        or_(
-            ImporterImportLog.mode == ImporterMode.PREVIEW_DELETE,
-            ImporterImportLog.mode == ImporterMode.PREVIEW_IMPORT,
-        ),
-        ImporterImportLog.start_time < seven_days_ago,
-    ).delete()
+def import_chunk_task(
+    log_id,
+    source_path,
+    source_type,
+    provider,
+    mode,
+    header_size,
+    offset,
+    count,
+    ignore_missing_rules,
+):
+    """Load a chunk of the records of an xml file task."""
+    log = ImporterImportLog.query.get(log_id)
+    return import_chunk_from_xml(
+        log,
+        source_path,
+        source_type,
+        provider,
+        mode,
+        header_size,
+        offset,
+        count,
+        ignore_missing_rules,
+    )
 
-    db.session.commit()
+
+@shared_task
+def finalize_chunked_import_task(errors, log_id):
+    """Finalize a chunked import task, once all its chunks are loaded."""
+    log = ImporterImportLog.query.get(log_id)
+    finalize_chunked_import(log, errors)
+
+
+@shared_task
+def prune_import_logs_task():
+    """Delete the importer logs past their retention, in short transactions."""
+    config = current_app.config
+    report = prune_import_logs(
+        config["CDS_ILS_IMPORTER_LOGS_RETENTION_DAYS"],
+        config["CDS_ILS_IMPORTER_LOGS_PRUNE_BATCH_SIZE"],
+        archive_path=config["CDS_ILS_IMPORTER_LOGS_ARCHIVE_PATH"],
+    )
+    current_app.logger.info(
+        "Pruned {logs} importer logs: {rows} rows, {bytes} bytes reclaimed.".format(
+            **report
+        )
+    )
+    return report
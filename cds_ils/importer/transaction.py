@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""CDS-ILS Importer transaction module."""
+
+from contextlib import contextmanager
+
+from flask import g
+from invenio_db import db
+
+
+def is_batched():
+    """Check if the changes are committed in batches of records."""
+    return g.get("importer_batched_transaction", False)
+
+
+def commit():
+    """Commit the session, unless the changes are batched."""
+    if not is_batched():
+        db.session.commit()
+
+
+def after_commit(callback):
+    """Run a callback once the changes of the record are committed.
+
+    When batched, the callback runs after the commit of the batch, and is
+    dropped if the record is rolled back.
+    """
+    if not is_batched():
+        callback()
+        return
+    g.importer_after_commit.append(callback)
+
+
+def commit_batch():
+    """Commit the batch of records, then run their commit callbacks."""
+    db.session.commit()
+    callbacks = g.get("importer_after_commit") or []
+    g.importer_after_commit = []
+    for callback in callbacks:
+        callback()
+
+
+def rollback():
+    """Rollback the session, unless the changes are batched.
+
+    When batched, the savepoint of the record being imported is rolled back
+    instead, as soon as the error leaves the record import: the callers must
+    raise the error again.
+    """
+    if not is_batched():
+        db.session.rollback()
+
+
+@contextmanager
+def batched_transaction(batch_size, locked=False):
+    """Defer the importer commits to the caller when batching records.
+
+    The commits are also deferred when the records lock their matching keys,
+    so that the locks are held until the whole record is committed.
+    """
+    g.importer_batched_transaction = batch_size > 1 or locked
+    g.importer_after_commit = []
+    try:
+        yield
+    finally:
+        g.importer_batched_transaction = False
+
+
+@contextmanager
+def record_savepoint():
+    """Roll back the changes and the commit callbacks of a record on errors."""
+    pending_count = len(g.importer_after_commit)
+    try:
+        with db.session.begin_nested():
+            yield
+    except Exception:
+        del g.importer_after_commit[pending_count:]
+        raise
@@ -21,7 +21,7 @@ from cds_ils.importer.json.views import JSONImporterListView
 from cds_ils.importer.loaders.jsonschemas.schema import ImporterImportSchemaV1
 from cds_ils.importer.models import ImporterImportLog
 from cds_ils.importer.serializers import task_entry_response, task_log_response
-from cds_ils.importer.tasks import create_import_task
+from cds_ils.importer.tasks import create_import_task, resume_import_task
 
 
 def create_importer_blueprint(app):
@@ -68,10 +68,24 @@ def create_importer_blueprint(app):
         methods=["GET"],
     )
 
+    blueprint.add_url_rule(
+        "/importer/<int:log_id>/records",
+        view_func=details_view,
+        methods=["GET"],
+    )
+
     blueprint.add_url_rule(
         "/importer/<int:log_id>/cancel",
         view_func=details_view,
         methods=["POST"],
+        defaults={"action": "cancel"},
+    )
+
+    blueprint.add_url_rule(
+        "/importer/<int:log_id>/resume",
+        view_func=details_view,
+        methods=["POST"],
+        defaults={"action": "resume"},
     )
 
     @blueprint.errorhandler(413)
@@ -91,27 +105,55 @@ class ImporterDetailsView(ContentNegotiatedMethodView):
         super(ImporterDetailsView, self).__init__(serializers, *args, **kwargs)
 
     @need_permissions("document-importer")
-    def get(self, log_id, offset):
-        """Returns the detail views of each subtask by given offset."""
+    def get(self, log_id, offset=None):
+        """Returns the detail views of each subtask by given offset or cursor.
+
+        The ``/offset`` route returns all the entries from the offset, as it
+        always did. The ``/records`` route returns them by pages of ``size``
+        entries after the ``after`` cursor, with their JSON columns only if
+        ``full``.
+        """
+        if offset is not None:
+            kwargs = dict(record_offset=offset)
+        else:
+            config = current_app.config
+            size = request.args.get(
+                "size", config["CDS_ILS_IMPORTER_RECORDS_PAGE_SIZE"], type=int
+            )
+            kwargs = dict(
+                after=request.args.get("after", 0, type=int),
+                size=max(
+                    1, min(size, config["CDS_ILS_IMPORTER_RECORDS_MAX_PAGE_SIZE"])
+                ),
+                full=request.args.get("full", "").lower() in ("1", "true"),
+            )
         try:
             log = db.session.query(ImporterImportLog).get(log_id)
 
             if log is None:
                 abort(404, "Task does not exist.")
 
-            return self.make_response(log, record_offset=offset)
+            return self.make_response(log, **kwargs)
         except ObjectDeletedError:
             abort(404, "The task log was deleted.")
 
     @need_permissions("document-importer")
-    def post(self, log_id):
-        """Cancels the ongoing celery task."""
+    def post(self, log_id, action="cancel"):
+        """Cancels the ongoing celery task, or resumes an interrupted one."""
         try:
             log = db.session.query(ImporterImportLog).get(log_id)
 
             if log is None:
                 abort(404, "Task does not exist.")
 
+            if action == "resume":
+                if not log.is_resumable():
+                    abort(400, "The task cannot be resumed.")
+                if not os.path.exists(log.source_path):
+                    abort(400, "The source file of the task was deleted.")
+                resume_import_task(log)
+                return self.make_response(log, code=202)
+
             log.set_cancelled()
             db.session.commit()
             return self.make_response(log, code=200)
@@ -166,7 +208,11 @@ class ImporterListView(ContentNegotiatedMethodView):
 
     @need_permissions("document-importer")
     def get(self):
-        """Get method."""
+        """Get method.
+
+        The run summaries are read from the counters of the task logs, the
+        entry logs are not loaded.
+        """
         list_count = 50
         logs = (
             ImporterImportLog.query.order_by(ImporterImportLog.id.desc())
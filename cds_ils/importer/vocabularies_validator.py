@@ -9,13 +9,15 @@
 """Vocabularies validator."""
 
 import json
-import os
 import pathlib
+import time
+from collections import Counter
 
 from invenio_app_ils.errors import VocabularyError
 from invenio_app_ils.proxies import current_app_ils
 
 CURRENT_DIR = pathlib.Path(__file__).parent.absolute()
+VOCABULARIES_DATA_DIR = CURRENT_DIR.parent / "vocabularies" / "data"
 
 VOCABULARIES_TYPE_FILENAME = {
     "acq_medium": "acq_order_line_mediums.json",
@@ -49,13 +51,10 @@ VOCABULARIES_TYPE_FILENAME = {
 }
 
 
-def json_fetcher(vocab_type, _):
+def json_fetcher(vocab_type):
     """Fetch all values for the given type from the vocab JSON file."""
     filename = VOCABULARIES_TYPE_FILENAME[vocab_type]
-    filepath = os.path.join(
-        os.path.realpath("."), "cds_ils", "vocabularies", "data", filename
-    )
-    with open(filepath) as fp:
+    with open(VOCABULARIES_DATA_DIR / filename) as fp:
         data = json.load(fp)
         return [d["key"] for d in data]
 
@@ -69,40 +68,93 @@ def es_fetcher(vocab_type, key):
         return key
 
 
+def es_batch_fetcher(vocab_type, keys):
+    """Return the given keys existing in the vocabulary in ES."""
+    vocabulary_search = current_app_ils.vocabulary_search_cls()
+    search = (
+        vocabulary_search.search_by_type(vocab_type)
+        .filter("terms", key=list(keys))
+        .source(["key"])
+    )
+    counts = Counter(hit.key for hit in search.scan())
+    return {key for key, count in counts.items() if count == 1}
+
+
+class VocabularyRegistry(object):
+    """Keys of the JSON vocabularies, loaded once per process."""
+
+    def __init__(self):
+        """Constructor."""
+        self.vocabularies = dict()
+
+    def get(self, vocab_type):
+        """Return the keys of a vocabulary, loading its file the first time."""
+        try:
+            return self.vocabularies[vocab_type]
+        except KeyError:
+            keys = frozenset(json_fetcher(vocab_type))
+            self.vocabularies[vocab_type] = keys
+            return keys
+
+    def load(self):
+        """Load all the vocabularies."""
+        for vocab_type in VOCABULARIES_TYPE_FILENAME:
+            self.get(vocab_type)
+
+    def clear(self):
+        """Forget the loaded vocabularies."""
+        self.vocabularies = dict()
+
+
+vocabulary_registry = VocabularyRegistry()
+
+
 class Validator(object):
-    """Vocabulary values validator."""
+    """Vocabulary values validator.
+
+    JSON vocabularies are looked up in the registry. Keys found or not
+    found in the vocabularies stored in the search engine are cached for
+    ``CACHE_TTL`` seconds, or until the next ``reset``.
+    """
 
     CACHE = dict()
+    CACHE_TTL = 60 * 60
+
+    def _cached(self, vocab_type, key):
+        """Return if the key was found, None when not cached or expired."""
+        entry = self.CACHE.get(vocab_type, {}).get(key)
+        if entry is None:
+            return None
+        found, expires_at = entry
+        if time.monotonic() > expires_at:
+            return None
+        return found
+
+    def _cache(self, vocab_type, key, found):
+        """Cache if the key was found in the search engine."""
+        expires_at = time.monotonic() + self.CACHE_TTL
+        self.CACHE.setdefault(vocab_type, dict())[key] = (found, expires_at)
+
+    def _es_vocab_has_key(self, vocab_type, key):
+        """Return True if key is in cache or in the search engine."""
+        found = self._cached(vocab_type, key)
+        if found is None:
+            found = es_fetcher(vocab_type, key) is not None
+            self._cache(vocab_type, key, found)
+        return found
 
-    def _fetch(self, vocab_type, key, definition):
-        """Fetch vocabulary key from its source."""
+    def _vocab_has_key(self, vocab_type, key, definition):
+        """Return True if key is in the vocabulary of the definition."""
         source = definition["source"]
         if source == "json":
-            values = json_fetcher(vocab_type, key)
-            return set(values) if values else set()
+            return key in vocabulary_registry.get(vocab_type)
         elif source == "elasticsearch":
-            value = es_fetcher(vocab_type, key)
-            return set([value]) if value is not None else set()
+            return self._es_vocab_has_key(vocab_type, key)
         else:
             raise VocabularyError(
                 "Definition {0} is wrong, unknown source {1}".format(definition, source)
             )
 
-    def _vocab_has_key(self, vocab_type, key, definition):
-        """Return True if key is in cache or in source, updating cache."""
-        self.CACHE.setdefault(vocab_type, set())
-        cache_has_key = key in self.CACHE[vocab_type]
-        if not cache_has_key:
-            keys = self._fetch(vocab_type, key, definition)
-            cache_has_key = key in keys
-            if cache_has_key:
-                # add all keys to the CACHE set
-                self.CACHE[vocab_type] |= keys
-                return True
-            else:
-                return False
-        return True
-
     def _validate_vocab_field(self, definition, key):
         """Raise if vocab key does not exist."""
         vocab_type = definition["type"]
@@ -112,8 +164,8 @@ class Validator(object):
                 "Value {0} not found in vocabulary {1}".format(key, vocab_type)
             )
 
-    def validate(self, definitions, record):
-        """Traverse each vocab field and validate the existence of values."""
+    def _vocab_values(self, definitions, record):
+        """Yield the definition and value of each vocab field of a record."""
         for field, value in record.items():
             has_definition = field in definitions
             if not has_definition:
@@ -123,19 +175,59 @@ class Validator(object):
             definition = definitions[field]
             # field should be validated
             if isinstance(value, dict):
-                self.validate(definition, value)
+                yield from self._vocab_values(definition, value)
             elif isinstance(value, list):
                 # list can contain a list of values or objs
                 for el in value:
                     if isinstance(el, dict):
-                        self.validate(definition, el)
+                        yield from self._vocab_values(definition, el)
                     else:
-                        self._validate_vocab_field(definition, el)
+                        yield definition, el
             else:
-                self._validate_vocab_field(definition, value)
+                yield definition, value
+
+    def validate(self, definitions, record):
+        """Traverse each vocab field and validate the existence of values."""
+        for definition, value in self._vocab_values(definitions, record):
+            self._validate_vocab_field(definition, value)
+
+    def prefetch(self, definitions, records):
+        """Search the not cached search engine vocab values in one query.
+
+        The values of all the records are searched together, in a single
+        query per vocabulary type, before the records are validated.
+        """
+        keys_by_type = dict()
+        for record in records:
+            for definition, value in self._vocab_values(definitions, record):
+                is_es_value = definition.get("source") == "elasticsearch"
+                if is_es_value and self._cached(definition["type"], value) is None:
+                    keys_by_type.setdefault(definition["type"], set()).add(value)
+
+        for vocab_type, keys in keys_by_type.items():
+            found_keys = es_batch_fetcher(vocab_type, keys)
+            for key in keys:
+                self._cache(vocab_type, key, key in found_keys)
+
+    def validate_many(self, definitions, records):
+        """Validate the vocab fields of many records, each value once.
+
+        The search engine vocab values of all the records are searched
+        together, in a single query per vocabulary type.
+        """
+        records = list(records)
+        self.prefetch(definitions, records)
+
+        validated = set()
+        for record in records:
+            for definition, value in self._vocab_values(definitions, record):
+                vocab = (definition["type"], definition["source"], value)
+                if vocab not in validated:
+                    self._validate_vocab_field(definition, value)
+                    validated.add(vocab)
 
     def reset(self):
-        """Invalidate cache."""
+        """Invalidate the search engine vocabularies cache."""
         self.CACHE = dict()
 
 
@@ -14,6 +14,7 @@ from logging import FileHandler
 import click
 from flask.cli import with_appcontext
 
+from cds_ils.importer.profiler import profiling_rules
 from cds_ils.importer.vocabularies_validator import validator as vocabulary_validator
 from cds_ils.migrator.acquisition.orders import import_orders_from_json
 from cds_ils.migrator.api import (
@@ -116,16 +117,31 @@ def migration():
     "--fail-on-exceptions",
     is_flag=True,
 )
+@click.option(
+    "--profile-rules",
+    is_flag=True,
+    help="Print the calls and time of each translation rule at the end.",
+)
 @with_appcontext
-def documents(sources, source_type, include, skip_indexing, fail_on_exceptions=False):
+def documents(
+    sources,
+    source_type,
+    include,
+    skip_indexing,
+    fail_on_exceptions=False,
+    profile_rules=False,
+):
     """Migrate documents from CDS legacy."""
-    import_documents_from_dump(
-        sources=sources,
-        source_type=source_type,
-        eager=True,
-        include=include,
-        raise_exceptions=fail_on_exceptions,
-    )
+    with profiling_rules(profile_rules) as rule_profiler:
+        import_documents_from_dump(
+            sources=sources,
+            source_type=source_type,
+            eager=True,
+            include=include,
+            raise_exceptions=fail_on_exceptions,
+        )
+    if rule_profiler is not None:
+        click.echo(rule_profiler.format_report())
     # We don't get the record back from _loadrecord so re-index all documents
     if not skip_indexing:
         reindex_pidtype("docid")
@@ -84,17 +84,19 @@ def import_vendors_from_json(dump_file, rectype="provider"):
     dump_file = dump_file[0]
 
     click.echo("Importing vendors ..")
-    with click.progressbar(json.load(dump_file)) as input_data:
+    records = json.load(dump_file)
+    for record in records:
+        record["type"] = "VENDOR"
+        # Legacy_ids in the .json file can be an array of strings or just
+        # an integer, but we only accept an array of strings in the schema
+        if not isinstance(record["legacy_ids"], list):
+            record["legacy_ids"] = [str(record["legacy_ids"])]
+    # all the vendors are validated before importing the first one
+    vocabulary_validator.validate_many(VOCABULARIES_FIELDS, records)
+
+    with click.progressbar(records) as input_data:
         ils_records = []
         for record in input_data:
-            record["type"] = "VENDOR"
-            # Legacy_ids in the .json file can be an array of strings or just
-            # an integer, but we only accept an array of strings in the schema
-            if not isinstance(record["legacy_ids"], list):
-                record["legacy_ids"] = [str(record["legacy_ids"])]
-
-            vocabulary_validator.validate(VOCABULARIES_FIELDS, record)
-
             ils_record = import_record(
                 record,
                 rectype=rectype,
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark the rules dispatch of the importer models.
+
+Compares the rules index lookup with the dispatch table lookup, for the
+MARC keys of the records of the ``tests/importer/data`` fixtures, grouped
+by the provider model translating them. Run it with::
+
+    python -m tests.importer.benchmark_rules_dispatch
+"""
+
+import glob
+import os
+import timeit
+
+from cds_dojson.marc21.utils import create_record
+from cds_dojson.matcher import matcher
+from lxml import etree
+
+from cds_ils.importer import marc21
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data")
+ROUNDS = 1000
+
+
+def collect_keys():
+    """Return the MARC keys of the fixture records, by model."""
+    keys_by_model = {}
+    for path in sorted(glob.glob(os.path.join(DATA_PATH, "*.xml"))):
+        root = etree.parse(path).getroot()
+        for record in root.iter("{*}record"):
+            marc_record = create_record(record)
+            model = matcher(marc_record, marc21.entry_point_models)
+            keys = keys_by_model.setdefault(model.__class__.__name__, (model, []))
+            keys[1].extend(marc_record.keys())
+    return keys_by_model
+
+
+def main():
+    """Print the lookup time of each model, with and without dispatch."""
+    marc21.build()
+    print(
+        "{0:<20} {1:>6} {2:>12} {3:>12} {4:>8}".format(
+            "model", "keys", "index (us)", "table (us)", "speedup"
+        )
+    )
+    for name, (model, keys) in sorted(collect_keys().items()):
+        index_time = timeit.timeit(
+            lambda: [model.index.query(key) for key in keys], number=ROUNDS
+        )
+        table_time = timeit.timeit(
+            lambda: [model.resolve(key) for key in keys], number=ROUNDS
+        )
+        print(
+            "{0:<20} {1:>6} {2:>12.2f} {3:>12.2f} {4:>7.1f}x".format(
+                name,
+                len(keys),
+                index_time / ROUNDS * 1e6,
+                table_time / ROUNDS * 1e6,
+                index_time / table_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark the values mapping of the CDS rules.
+
+Compares the per call latency of ``mapping`` with the linear scan of the
+maps it replaces, for every value of every map of the values module and
+for a value missing from it. Run it with::
+
+    python -m tests.importer.benchmark_values_mapping
+"""
+
+import timeit
+
+from cds_ils.importer.errors import UnexpectedValue
+from cds_ils.importer.providers.cds.rules import values_mapping
+from cds_ils.importer.providers.cds.rules.values_mapping import mapping
+
+CALLS = 20000
+
+MISSING_VALUE = "NOT A MAPPED VALUE"
+
+
+def linear_mapping(
+    field_map, val, raise_exception=False, default_val=None, subfield=None
+):
+    """Map a value by scanning the map, as before the lookup tables."""
+    if isinstance(val, str):
+        val = val.strip()
+    if val:
+        if isinstance(field_map, dict):
+            for k, v in field_map.items():
+                if val.upper() in v:
+                    return k
+        elif isinstance(field_map, list):
+            if val in field_map:
+                return val
+        if default_val:
+            return default_val
+        if raise_exception:
+            raise UnexpectedValue(subfield=subfield)
+
+
+def collect_maps():
+    """Return the maps of the values module with the values to look up."""
+    maps = {}
+    for name, field_map in sorted(vars(values_mapping).items()):
+        if name == "COMPILED_MAPPINGS":
+            continue
+        if name.isupper() and isinstance(field_map, (dict, list)):
+            if isinstance(field_map, dict):
+                values = [value for v in field_map.values() for value in v]
+            else:
+                values = list(field_map)
+            maps[name] = (field_map, values + [MISSING_VALUE])
+    return maps
+
+
+def main():
+    """Print the latency of each map lookup, with and without tables."""
+    print(
+        "{0:<40} {1:>6} {2:>12} {3:>12} {4:>8}".format(
+            "map", "values", "scan (ns)", "table (ns)", "speedup"
+        )
+    )
+    for name, (field_map, values) in collect_maps().items():
+        rounds = max(1, CALLS // len(values))
+        calls = len(values) * rounds
+        scan_time = timeit.timeit(
+            lambda: [linear_mapping(field_map, value) for value in values],
+            number=rounds,
+        )
+        table_time = timeit.timeit(
+            lambda: [mapping(field_map, value) for value in values],
+            number=rounds,
+        )
+        print(
+            "{0:<40} {1:>6} {2:>12.0f} {3:>12.0f} {4:>7.1f}x".format(
+                name,
+                len(values),
+                scan_time / calls * 1e9,
+                table_time / calls * 1e9,
+                scan_time / table_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
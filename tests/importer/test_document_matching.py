@@ -1,5 +1,11 @@
+import pytest
+from invenio_app_ils.proxies import current_app_ils
+from invenio_pidstore.errors import PIDDoesNotExistError
+
 from cds_ils.importer.documents.api import fuzzy_search_document
 from cds_ils.importer.documents.importer import DocumentImporter
+from cds_ils.importer.matching import DocumentMatchesCache, IdentifiersIndex
+from cds_ils.importer.records import DocumentsCache, get_records_by_pids
 
 from ..helpers import load_json_from_datadir
 
@@ -104,3 +110,90 @@ def test_fuzzy_matching(importer_test_data):
     results = fuzzy_search_document(data_to_update["title"], authors).scan()
     matches = [x.pid for x in results]
     assert matches == ["docid-5"]
+
+
+def test_document_search_matching_prefetched(importer_test_data):
+    helper_metadata_fields = ("_items", "agency_code")
+    metadata_provider = "springer"
+    update_document_fields = ("identifiers", "alternative_identifiers")
+
+    data_to_update = load_json_from_datadir(
+        "match_testing_documents.json", relpath="importer"
+    )
+    document_importers = [
+        DocumentImporter(
+            json_data,
+            helper_metadata_fields,
+            metadata_provider,
+            update_document_fields,
+        )
+        for json_data in data_to_update
+    ]
+
+    matches_cache = DocumentMatchesCache(max_hits=100)
+    matches_cache.prefetch(
+        [
+            matching_search
+            for document_importer in document_importers
+            for matching_search in document_importer.matching_searches()
+        ]
+    )
+
+    for document_importer in document_importers:
+        assert (
+            document_importer.search_for_matching_documents(matches_cache=matches_cache)
+            == document_importer.search_for_matching_documents()
+        )
+
+    # invalidated searches are run again
+    matches_cache.invalidate({("identifier", "ISBN", "0123456789")})
+    for key, matching_search in document_importers[0].matching_searches():
+        if key == ("identifier", "ISBN", "0123456789"):
+            assert matches_cache.get(matching_search) is None
+
+
+def test_identifiers_index():
+    identifiers_index = IdentifiersIndex()
+    document = {
+        "pid": "docid-1",
+        "identifiers": [
+            {"scheme": "ISBN", "value": "0123456789"},
+            {"scheme": "DOI", "value": "10.1007/1234"},
+            {"scheme": "ISSN", "value": "1234-5678"},
+        ],
+    }
+    identifiers_index.add(document)
+    identifiers_index.add(
+        {"pid": "docid-2", "identifiers": [{"scheme": "ISBN", "value": "0123456789"}]}
+    )
+
+    assert len(identifiers_index) == 2
+    assert identifiers_index.footprint() > 0
+    assert identifiers_index.get(("identifier", "ISBN", "0123456789")) == [
+        "docid-1",
+        "docid-2",
+    ]
+    assert identifiers_index.get(("identifier", "ISBN", "10.1007/1234")) == []
+    assert not identifiers_index.covers(("identifier", "ISSN", "1234-5678"))
+    assert not identifiers_index.covers(("title", "a title"))
+
+    identifiers_index.remove(document)
+    assert identifiers_index.get(("identifier", "ISBN", "0123456789")) == ["docid-2"]
+    assert identifiers_index.get(("identifier", "DOI", "10.1007/1234")) == []
+
+
+def test_get_records_by_pids(importer_test_data):
+    """Test that the records are loaded together, through the cache."""
+    document_cls = current_app_ils.document_record_cls
+    pids = [document["pid"] for document in importer_test_data["documents"][:2]]
+    cache = DocumentsCache(max_size=1)
+
+    documents = get_records_by_pids(document_cls, pids + pids[:1], cache=cache)
+    assert [document["pid"] for document in documents] == pids + pids[:1]
+    # the least recently used document was evicted
+    assert cache.get(pids[0]) is None
+    assert cache.get(pids[1]) is documents[1]
+    assert get_records_by_pids(document_cls, pids[1:], cache=cache) == [documents[1]]
+
+    with pytest.raises(PIDDoesNotExistError):
+        get_records_by_pids(document_cls, ["not-a-pid"])
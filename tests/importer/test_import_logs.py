@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer logs."""
+
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from invenio_accounts.testutils import login_user_via_session
+from invenio_app_ils.errors import VocabularyError
+
+from cds_ils.importer.api import finalize_chunked_import, import_records
+from cds_ils.importer.checkpoints import ImportCheckpoints
+from cds_ils.importer.handlers import get_importer_handler, importing_chunk
+from cds_ils.importer.models import (
+    ImporterAgent,
+    ImporterImportLog,
+    ImporterMode,
+    ImporterTaskStatus,
+    ImportRecordLog,
+    buffered_record_logs,
+    compact_report,
+)
+from cds_ils.importer.retention import prune_import_logs
+from cds_ils.importer.serializers.schema import (
+    ImporterRecordReportSchemaV1,
+    ImporterTaskDetailLogV1,
+    ImporterTaskLogV1,
+)
+from cds_ils.importer.transaction import after_commit, batched_transaction
+
+
+def _create_log(mode=ImporterMode.IMPORT, **kwargs):
+    """Create an import log."""
+    return ImporterImportLog.create(
+        dict(
+            agent=ImporterAgent.CLI,
+            provider="springer",
+            source_type="marcxml",
+            mode=mode,
+            original_filename="test.xml",
+            **kwargs,
+        )
+    )
+
+
+def test_buffered_record_logs(app, db):
+    """Test that record logs are inserted in bulk and flushed on exit."""
+    log = _create_log()
+
+    with buffered_record_logs(max_size=3, max_delay=60):
+        for recid in range(4):
+            ImportRecordLog.create_success(
+                log.id, str(recid), {"action": "create", "raw_json": {"n": recid}}
+            )
+        # the first three entries are flushed, the last one is buffered
+        assert log.records.count() == 3
+
+        ImportRecordLog.create_failure(log.id, "5", ValueError("wrong value"))
+
+    entries = log.records.order_by(ImportRecordLog.id.asc()).all()
+    assert [entry.entry_recid for entry in entries] == ["0", "1", "2", "3", "5"]
+    assert entries[3].raw_json == {"n": 3}
+    assert entries[4].error == "ValueError: wrong value"
+
+
+def test_buffered_record_logs_committed_with_batch(app, db):
+    """Test that the buffered record logs are committed with their batch."""
+    log = _create_log()
+    translated_records = [
+        (str(recid), None, False, VocabularyError("wrong value")) for recid in range(3)
+    ]
+
+    with buffered_record_logs(max_size=10, max_delay=60):
+        import_records(log, iter(translated_records), "springer", "IMPORT")
+        # committed one by one, the logs are not left in the buffer
+        assert log.records.count() == 3
+
+
+def test_import_records_cancelled(app, db):
+    """Test that a cancelled import stops before its next record."""
+    log = _create_log()
+
+    def translated_records():
+        for recid in range(5):
+            if recid == 2:
+                # cancelled from the importer view meanwhile
+                ImporterImportLog.query.filter_by(id=log.id).update(
+                    {"status": ImporterTaskStatus.CANCELLED}
+                )
+            yield str(recid), None, False, VocabularyError("wrong value")
+
+    with batched_transaction(10):
+        import_records(log, translated_records(), "springer", "IMPORT", 10)
+    assert log.status == ImporterTaskStatus.CANCELLED
+    assert log.processed_count == 2
+
+
+def test_import_checkpoints(app, db):
+    """Test that an import is resumed from its last checkpoint."""
+    log = _create_log()
+    xml = (
+        """<collection xmlns="http://www.loc.gov/MARC21/slim">"""
+        + "".join("<record>{0}</record>".format(i) for i in range(5))
+        + "</collection>"
+    ).encode()
+
+    checkpoints = ImportCheckpoints.scan(log, io.BytesIO(xml), interval=2)
+    assert len(checkpoints) == 5
+    for index in range(1, 4):
+        ImportRecordLog.create_success(log.id, str(index - 1), {"action": "none"})
+        checkpoints.after(index)
+    assert log.checkpoint_index == 2
+    assert xml[log.checkpoint_offset :].startswith(b"<record>2</record>")
+
+    resumed = ImportCheckpoints.scan(log, io.BytesIO(xml), interval=2, resume=True)
+    assert resumed.start == 2
+    assert resumed.start_offset == log.checkpoint_offset
+    # logged after the checkpoint, before the interruption
+    assert resumed.restore("2")
+    assert not resumed.restore("3")
+
+    # the side effects of the batch are run with the checkpoint commit
+    calls = []
+    with batched_transaction(10):
+        after_commit(lambda: calls.append("deleted from the index"))
+        checkpoints.checkpoint(4)
+    assert calls == ["deleted from the index"]
+
+    # the source changed, the logged entries are skipped from the start
+    log.set_checkpoint(2, 0)
+    resumed = ImportCheckpoints.scan(log, io.BytesIO(xml), interval=2, resume=True)
+    assert resumed.start == 0
+    assert resumed.start_offset is None
+
+
+def test_resume_running_import(app, db, client, admin, json_headers, tmp_path):
+    """Test that a running import cannot be resumed until it is interrupted."""
+    source_path = tmp_path / "source.xml"
+    source_path.write_bytes(b"<collection><record/></collection>")
+    log = _create_log(source_path=str(source_path))
+    log.set_checkpoint(0, None)
+    db.session.commit()
+    assert log.is_active()
+
+    login_user_via_session(client, email=admin.email)
+    url = "/importer/{0}/resume".format(log.id)
+    res = client.post(url, headers=json_headers)
+    assert res.status_code == 400
+    assert log.is_running()
+
+    # no checkpoint was committed for too long, the import was interrupted
+    log.checkpoint_time = datetime.now() - timedelta(
+        hours=app.config["CDS_ILS_IMPORTER_STALE_HOURS"] + 1
+    )
+    assert not log.is_active()
+    assert log.is_resumable()
+
+    log.set_cancelled()
+    assert log.is_resumable()
+    log.source_path = None
+    assert not log.is_resumable()
+
+
+def test_finalize_chunked_import(app, db):
+    """Test that the chunks progress is aggregated in the shared log."""
+    log = _create_log()
+    other_log = ImporterImportLog.query.get(log.id)
+    for _ in range(3):
+        log.increment_processed_count()
+        other_log.increment_processed_count()
+    assert log.processed_count == other_log.processed_count == 6
+
+    finalize_chunked_import(log, [None, None])
+    assert log.status == ImporterTaskStatus.SUCCEEDED
+
+    # the unknown errors of the chunks only stop them
+    log = _create_log()
+    with importing_chunk():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                get_importer_handler(ValueError("wrong value"), log)
+    assert log.is_running()
+    finalize_chunked_import(log, [None, "ValueError: wrong value"])
+    assert log.status == ImporterTaskStatus.FAILED
+    assert "ValueError: wrong value" in log.message
+
+    log.set_cancelled()
+    finalize_chunked_import(log, [None, None])
+    assert log.status == ImporterTaskStatus.CANCELLED
+
+
+def test_records_keyset_pagination(app, db):
+    """Test that the entry logs are paginated by cursor, with counters."""
+    log = _create_log()
+    for recid in range(5):
+        ImportRecordLog.create_success(
+            log.id, str(recid), {"action": "create", "raw_json": {"n": recid}}
+        )
+    ImportRecordLog.create_failure(log.id, "5", ValueError("wrong value"))
+    assert (log.records_count, log.created_count, log.error_count) == (6, 5, 1)
+
+    data = ImporterTaskDetailLogV1(after=0, size=4, full=False).dump(log)
+    assert [record["entry_recid"] for record in data["records"]] == list("0123")
+    assert "raw_json" not in data["records"][0]
+    assert data["has_more"]
+    assert data["loaded_entries"] == 6
+
+    data = ImporterTaskDetailLogV1(after=data["next_cursor"], size=4).dump(log)
+    assert [record["entry_recid"] for record in data["records"]] == ["4", "5"]
+    assert data["records"][0]["raw_json"] == {"n": 4}
+    assert not data["records"][1]["success"]
+    assert not data["has_more"]
+
+    data = ImporterTaskDetailLogV1(record_offset=3).dump(log)
+    assert [record["entry_recid"] for record in data["records"]] == ["3", "4", "5"]
+    assert data["records"][0]["raw_json"] == {"n": 3}
+    assert data["loaded_entries"] == 6
+    assert "next_cursor" not in data
+
+
+def test_per_action_counters(app, db):
+    """Test that the task log counts its entries by action."""
+    log = _create_log()
+    partial_matches = [{"pid": "1", "type": "title"}]
+    with buffered_record_logs(max_size=3, max_delay=60):
+        for recid, action in enumerate(["create", "update", "delete", "unchanged"]):
+            ImportRecordLog.create_success(
+                log.id, str(recid), {"action": action, "partial_matches": []}
+            )
+        ImportRecordLog.create_success(
+            log.id, "4", {"action": "none", "partial_matches": partial_matches}
+        )
+    ImportRecordLog.create_failure(log.id, "5", ValueError("wrong value"))
+
+    data = ImporterTaskLogV1().dump(log)
+    assert data["records_count"] == 6
+    counters = (
+        "created_count",
+        "updated_count",
+        "deleted_count",
+        "unchanged_count",
+        "error_count",
+        "partial_matches_count",
+    )
+    assert [data[counter] for counter in counters] == [1, 1, 1, 1, 1, 1]
+
+
+def test_compact_report():
+    """Test that the compacted report columns are decoded transparently."""
+    raw_json = {"title": "Title", "identifiers": [{"scheme": "ISBN", "value": "1"}]}
+    document_json = {"pid": "1", "title": "Title", "created_by": {"type": "import"}}
+    data = compact_report(
+        dict(
+            entry_recid="1",
+            action="update",
+            raw_json=raw_json,
+            document_json=document_json,
+            eitem={"output_pid": "2"},
+        )
+    )
+    assert "raw_json" not in data and "document_json" not in data
+    assert data["action"] == "update"
+
+    record_log = ImportRecordLog(**data)
+    assert record_log.raw_json is None
+    assert record_log.get_report_field("document_json") == document_json
+    assert record_log.get_report_field("raw_json") == raw_json
+    assert record_log.get_report_field("series") is None
+
+    dumped = ImporterRecordReportSchemaV1().dump(record_log)
+    assert dumped["document_json"] == document_json
+    assert dumped["eitem"]["output_pid"] == "2"
+    assert dumped["success"]
+
+
+def test_prune_import_logs(app, db, tmp_path):
+    """Test that the logs past their retention are pruned by batches."""
+    old = datetime.now() - timedelta(days=10)
+    succeeded = ImporterTaskStatus.SUCCEEDED
+    stale_log = _create_log(
+        ImporterMode.PREVIEW_IMPORT, start_time=old, status=succeeded
+    )
+    running_log = _create_log(
+        ImporterMode.PREVIEW_IMPORT, start_time=old, checkpoint_time=datetime.now()
+    )
+    interrupted_log = _create_log(ImporterMode.PREVIEW_IMPORT, start_time=old)
+    recent_log = _create_log(ImporterMode.PREVIEW_DELETE, status=succeeded)
+    import_log = _create_log(start_time=old, status=succeeded)
+    for recid in range(5):
+        ImportRecordLog.create_success(stale_log.id, str(recid), {"action": "create"})
+    stale_log_id = stale_log.id
+    pruned_log_ids = [stale_log_id, interrupted_log.id]
+    kept_log_ids = [log.id for log in (running_log, recent_log, import_log)]
+    archive_path = str(tmp_path / "archive.jsonl")
+
+    retention = {"PREVIEW_IMPORT": 7, "PREVIEW_DELETE": 7, "IMPORT": None}
+    report = prune_import_logs(retention, batch_size=2, archive_path=archive_path)
+    assert report["logs"] == 2
+    assert report["rows"] == 7
+    db.session.expunge_all()
+    for log_id in pruned_log_ids:
+        assert ImporterImportLog.query.get(log_id) is None
+    assert ImportRecordLog.query.filter_by(import_id=stale_log_id).count() == 0
+    for log_id in kept_log_ids:
+        assert ImporterImportLog.query.get(log_id) is not None
+
+    with open(archive_path) as archive:
+        summaries = [json.loads(line) for line in archive]
+    assert [summary["id"] for summary in summaries] == pruned_log_ids
+    assert summaries[0]["records_count"] == 5
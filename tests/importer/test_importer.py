@@ -1,9 +1,12 @@
 import time
+from copy import deepcopy
 
+import pytest
 from invenio_app_ils.proxies import current_app_ils
 from invenio_search import current_search
 
 from cds_ils.importer.importer import Importer
+from cds_ils.importer.indexer import DeferredIndexer, deferred_indexing
 from tests.helpers import load_json_from_datadir
 
 
@@ -480,3 +483,69 @@ def test_duplicate_eitems_detection_during_import(importer_test_data):
     assert (
         eitem_report.get("action") == "create"
     ), f"Unexpected action: {eitem_report.get('action')}"
+
+
+def test_skip_unchanged_records(app, db):
+    """Test that a record imported again with the same JSON is skipped."""
+    app.config["CDS_ILS_IMPORTER_SKIP_UNCHANGED"] = True
+    json_data = load_json_from_datadir("create_documents_data.json", relpath="importer")
+    json_data[0]["provider_recid"] = "unchanged-1"
+
+    try:
+        report = Importer(deepcopy(json_data[0]), "springer").import_record()
+        assert report["action"] == "create"
+        current_search.flush_and_refresh(index="*")
+
+        report = Importer(deepcopy(json_data[0]), "springer").import_record()
+        assert report["action"] == "unchanged"
+        document_pid = report["output_pid"]
+
+        json_data[0]["abstract"] = "Changed abstract"
+        report = Importer(deepcopy(json_data[0]), "springer").import_record()
+        assert report["action"] == "update"
+        assert report["output_pid"] == document_pid
+    finally:
+        app.config["CDS_ILS_IMPORTER_SKIP_UNCHANGED"] = False
+
+
+def test_fuzzy_match_documents_pending_indexing(app, db):
+    """Test that a similar document imported in the same chunk is matched."""
+    json_data = load_json_from_datadir("create_documents_data.json", relpath="importer")
+    similar_json = deepcopy(json_data[0])
+    similar_json["title"] = "Half-light: Collected Poems 1965-2017"
+    similar_json["identifiers"] = []
+    del similar_json["_eitem"]
+
+    with deferred_indexing(chunk_size=10):
+        report = Importer(deepcopy(json_data[0]), "springer").import_record()
+        assert report["action"] == "create"
+        document_pid = report["output_pid"]
+
+        report = Importer(similar_json, "springer").import_record()
+        assert report["action"] == "create"
+        assert {"pid": document_pid, "type": "similar"} in report["partial_matches"]
+
+
+def test_deferred_indexer_drops_rolled_back_records():
+    """Test that the records of a failed record are never indexed."""
+
+    class Document(dict):
+        id = "1"
+
+    document = Document(pid="1", title="Half-light", authors=[])
+    deferred_indexer = DeferredIndexer(chunk_size=10, similarity_threshold=0.5)
+
+    with pytest.raises(ValueError):
+        with deferred_indexer.staging():
+            deferred_indexer.add(document, "documents", {("document", "1")})
+            raise ValueError("wrong value")
+    assert not deferred_indexer.pending
+    assert not deferred_indexer.pending_keys
+    assert not len(deferred_indexer.pending_documents)
+
+    with deferred_indexer.staging():
+        deferred_indexer.add(document, "documents", {("document", "1")})
+        assert not deferred_indexer.pending
+    assert deferred_indexer.pending == {"1": "documents"}
+    assert deferred_indexer.pending_keys == {("document", "1")}
+    assert len(deferred_indexer.pending_documents) == 1
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer matching locks."""
+
+import threading
+import uuid
+from copy import deepcopy
+
+from invenio_app_ils.proxies import current_app_ils
+
+from cds_ils.importer.json.load import ILSLoader
+from cds_ils.importer.locks import lock_id, matching_lock_keys
+from tests.helpers import load_json_from_datadir
+
+THREADS = 4
+
+
+def test_matching_lock_keys():
+    """Test that the lock keys of a record are normalized."""
+    json_data = {
+        "title": "The  Title",
+        "authors": [{"full_name": "Doe, John"}, {"full_name": "ANN  Smith"}],
+        "identifiers": [
+            {"scheme": "ISBN", "value": "978-3-16-148410-0"},
+            {"scheme": "CDS_RECID", "value": "1"},
+        ],
+        "_serial": [{"title": "Lecture notes series", "identifiers": []}],
+    }
+    other_json_data = {
+        "title": "the title",
+        "authors": [{"full_name": "ann smith"}, {"full_name": "doe, john"}],
+        "identifiers": [{"scheme": "ISBN", "value": "9783161484100"}],
+    }
+
+    keys = matching_lock_keys(json_data)
+    assert ("identifier", "9783161484100") in keys
+    assert ("title", "the title", ("ann smith", "doe, john")) in keys
+    assert ("series_title", "lecture notes") in keys
+    assert len(keys) == 3
+    assert matching_lock_keys(other_json_data) < keys
+    assert lock_id(("identifier", "9783161484100")) == lock_id(
+        ("identifier", "9783161484100")
+    )
+
+
+def test_matching_locks_prevent_duplicates(app, database, es_clear):
+    """Test that concurrent imports of the same record create one document."""
+    run = uuid.uuid4().hex
+    json_data = load_json_from_datadir(
+        "create_documents_data.json", relpath="importer"
+    )[0]
+    del json_data["_eitem"]
+    json_data["title"] = "Concurrently imported {0}".format(run)
+    json_data["identifiers"] = [{"scheme": "DOI", "value": "10.1000/{0}".format(run)}]
+    app.config["CDS_ILS_IMPORTER_MATCHING_LOCKS"] = True
+    reports, errors = [], []
+
+    def import_record():
+        with app.app_context():
+            try:
+                reports.append(
+                    ILSLoader("IMPORT", "springer").load(deepcopy(json_data))
+                )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                database.session.remove()
+
+    try:
+        threads = [threading.Thread(target=import_record) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        app.config["CDS_ILS_IMPORTER_MATCHING_LOCKS"] = False
+
+    assert not errors
+    actions = [report["action"] for report in reports]
+    assert actions.count("create") == 1
+    assert actions.count("update") == THREADS - 1
+    assert len({report["output_pid"] for report in reports}) == 1
+
+    model_cls = current_app_ils.document_record_cls.model_cls
+    with app.app_context():
+        documents = [
+            model
+            for model in model_cls.query.all()
+            if model.json and model.json.get("title") == json_data["title"]
+        ]
+    assert len(documents) == 1
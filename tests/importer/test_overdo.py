@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer rules dispatch."""
+
+import os
+
+import pytest
+from cds_dojson.marc21.utils import create_record
+from cds_dojson.matcher import matcher
+from lxml import etree
+
+from cds_ils.importer import marc21
+from cds_ils.importer.handlers import xml_import_handlers
+from cds_ils.importer.overdo import CdsIlsOverdo
+from cds_ils.importer.profiler import get_rule_profiler, profiling_rules
+
+from .benchmark_rules_dispatch import DATA_PATH, collect_keys
+
+UNKNOWN_FIELD = (
+    """<datafield xmlns="http://www.loc.gov/MARC21/slim" tag="{0}" ind1=" " """
+    """ind2=" "><subfield code="a">a</subfield><subfield code="q">q</subfield>"""
+    """</datafield>"""
+)
+
+
+def test_rules_dispatch_matches_index():
+    """Test that the dispatch table resolves the keys as the rules index."""
+    for model, keys in collect_keys().values():
+        if model.index is None:
+            model.build()
+        assert model.dispatch
+        for key in keys + ["999__", "0247_", "xyz"]:
+            assert model.resolve(key) == model.index.query(key)
+            assert key in model.dispatch
+
+
+def test_missing_rules_collected_in_translation(app):
+    """Test that the translation collects the same missing keys."""
+    root = etree.parse(os.path.join(DATA_PATH, "springer_record.xml")).getroot()
+    record = next(root.iter("{*}record"))
+    for tag in ("020", "888", "999"):
+        record.append(etree.fromstring(UNKNOWN_FIELD.format(tag)))
+    marc_record = create_record(record)
+
+    missing = set()
+    marc21.do(marc_record, exception_handlers=xml_import_handlers, missing=missing)
+
+    model = matcher(marc_record, marc21.entry_point_models)
+    assert missing == model.missing(marc_record)
+    assert missing == {"020__q", "888__a", "888__q", "999__a", "999__q"}
+
+
+def test_rules_profiler(base_app):
+    """Test that the profiler records the calls of the rules."""
+    model = CdsIlsOverdo()
+
+    @model.over("title", "^245__")
+    def title(self, key, value):
+        return value["a"]
+
+    @model.over("note", "^500__")
+    def note(self, key, value):
+        raise ValueError(value)
+
+    # the profiler is kept on the application context of the import
+    with base_app.app_context():
+        assert get_rule_profiler() is None
+        with profiling_rules(True) as rule_profiler:
+            assert get_rule_profiler() is rule_profiler
+            model.do({"245__": {"a": "Title"}})
+            model.do({"245__": {"a": "Other title"}})
+            with pytest.raises(ValueError):
+                model.do({"500__": {"a": "Note"}})
+        assert get_rule_profiler() is None
+        model.do({"245__": {"a": "Unprofiled"}})
+
+    report = {row["key"]: row for row in rule_profiler.report()}
+    assert report["245__"]["calls"] == 2
+    assert report["245__"]["exceptions"] == 0
+    assert report["245__"]["rule"].endswith(".title")
+    assert report["500__"]["calls"] == 1
+    assert report["500__"]["exceptions"] == 1
+    assert "245__" in rule_profiler.format_report()
+
+    with base_app.app_context(), profiling_rules(False) as rule_profiler:
+        assert rule_profiler is None
+        assert get_rule_profiler() is None
+    # no profiler outside of an application context
+    assert get_rule_profiler() is None
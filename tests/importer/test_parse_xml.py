@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer XML parsing."""
+
+import io
+import os
+
+from lxml import etree
+
+from cds_ils.importer.api import translate_records
+from cds_ils.importer.parse_xml import (
+    ResumedXMLFile,
+    get_record_recid_from_xml,
+    iter_record_offsets,
+    iter_records,
+)
+
+COLLECTION = (
+    """<?xml version="1.0" encoding="UTF-8"?>"""
+    """<collection xmlns="http://www.loc.gov/MARC21/slim">{0}</collection>"""
+)
+
+RECORD = """<record><controlfield tag="001">{0}</controlfield></record>"""
+
+
+def test_iter_records_streams_all_records(app):
+    """Test that the streaming parser yields every record in order."""
+    xml = COLLECTION.format("".join(RECORD.format(i) for i in range(5)))
+
+    recids = [
+        get_record_recid_from_xml(record)
+        for record in iter_records(io.BytesIO(xml.encode("utf-8")))
+    ]
+
+    assert recids == ["0", "1", "2", "3", "4"]
+
+
+def test_iter_records_matches_full_parse(app):
+    """Test that streaming and full parsing find the same records."""
+    dirname = os.path.join(os.path.dirname(__file__), "data")
+    for filename in ("safari_record.xml", "springer_record.xml"):
+        path = os.path.join(dirname, filename)
+        root = etree.parse(path).getroot()
+        expected = [
+            get_record_recid_from_xml(record)
+            for record in root.xpath(app.config["CDS_ILS_IMPORTER_RECORD_TAG"])
+        ]
+        with open(path, "rb") as source:
+            streamed = [
+                get_record_recid_from_xml(record) for record in iter_records(source)
+            ]
+        assert streamed == expected
+        assert streamed
+
+
+def test_iter_record_offsets_count():
+    """Test the record pre-scan count, across chunk boundaries."""
+    xml = COLLECTION.format("".join(RECORD.format(i) for i in range(7)))
+    xml += "<records/><marc:record xmlns:marc='x'/>"
+
+    for chunk_size in (1, 3, 17, 1024):
+        source = io.BytesIO(xml.encode("utf-8"))
+        assert len(list(iter_record_offsets(source, chunk_size=chunk_size))) == 8
+
+    dirname = os.path.join(os.path.dirname(__file__), "data")
+    with open(os.path.join(dirname, "safari_record.xml"), "rb") as source:
+        assert len(list(iter_record_offsets(source))) == 1
+
+
+def test_resume_from_record_offset():
+    """Test that the records are parsed from a record offset on."""
+    xml = COLLECTION.format("".join(RECORD.format(i) for i in range(5))).encode()
+
+    for chunk_size in (1, 5, 1024):
+        offsets = list(iter_record_offsets(io.BytesIO(xml), chunk_size=chunk_size))
+        assert [xml[offset : offset + 7] for offset in offsets] == [b"<record"] * 5
+
+    source = ResumedXMLFile(io.BytesIO(xml), offsets[0], offsets[3])
+    recids = [
+        get_record_recid_from_xml(record)
+        for _, record in etree.iterparse(source, events=("end",), tag="{*}record")
+    ]
+    assert recids == ["3", "4"]
+
+
+def test_translate_records_in_workers(base_app):
+    """Test that the translation processes keep the order of the records."""
+    path = os.path.join(os.path.dirname(__file__), "data", "springer_record.xml")
+    with base_app.app_context():
+        with open(path, "rb") as source:
+            expected = list(translate_records(iter_records(source), "springer"))
+        base_app.config["CDS_ILS_IMPORTER_TRANSLATION_WORKERS"] = 2
+        try:
+            with open(path, "rb") as source:
+                translated = list(translate_records(iter_records(source), "springer"))
+        finally:
+            base_app.config["CDS_ILS_IMPORTER_TRANSLATION_WORKERS"] = 0
+    assert [result[:2] for result in translated] == [result[:2] for result in expected]
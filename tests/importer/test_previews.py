@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer preview reuse."""
+
+from datetime import datetime, timedelta
+
+from cds_ils.importer.indexer import document_matching_keys
+from cds_ils.importer.models import (
+    ImporterAgent,
+    ImporterImportLog,
+    ImporterMode,
+    ImporterTaskStatus,
+    ImportRecordLog,
+)
+from cds_ils.importer.previews import PreviewReuse, fingerprint_source
+
+
+def test_fingerprint_source(tmp_path):
+    """Test that the fingerprint covers the file, provider and options."""
+    source_path = tmp_path / "source.xml"
+    source_path.write_bytes(b"<collection><record/></collection>")
+    fingerprint = fingerprint_source(str(source_path), "springer", False)
+
+    assert fingerprint == fingerprint_source(str(source_path), "springer", False)
+    assert fingerprint != fingerprint_source(str(source_path), "ebl", False)
+    assert fingerprint != fingerprint_source(str(source_path), "springer", True)
+    source_path.write_bytes(b"<collection><record/><record/></collection>")
+    assert fingerprint != fingerprint_source(str(source_path), "springer", False)
+
+
+def test_preview_reuse(app, db):
+    """Test that the previewed JSON and matches are reused while valid."""
+    preview_log = ImporterImportLog.create(
+        dict(
+            agent=ImporterAgent.USER,
+            provider="springer",
+            source_type="marcxml",
+            mode=ImporterMode.PREVIEW_IMPORT,
+            original_filename="test.xml",
+            fingerprint="f" * 64,
+            status=ImporterTaskStatus.SUCCEEDED,
+        )
+    )
+    json_data = {"title": "Title", "identifiers": []}
+    partial_matches = [{"pid": "1", "type": "similar"}]
+    entries = [
+        ("1", dict(action="create", output_pid="preview", raw_json=json_data)),
+        ("2", dict(action="create", output_pid="preview", raw_json=json_data)),
+        ("2", dict(action="create", output_pid="preview", raw_json=json_data)),
+        ("3", dict(action="update", output_pid="1", raw_json=json_data)),
+        (
+            "4",
+            dict(
+                action="error",
+                output_pid="preview",
+                raw_json=json_data,
+                partial_matches=partial_matches,
+            ),
+        ),
+    ]
+    for entry_recid, report in entries:
+        ImportRecordLog.create_success(preview_log.id, entry_recid, report)
+
+    assert (
+        ImporterImportLog.find_preview("f" * 64, datetime.now() - timedelta(hours=1))
+        == preview_log
+    )
+    preview_reuse = PreviewReuse(preview_log)
+    assert preview_reuse.translated("1") == json_data
+    # the recids present more than once are not reused
+    assert preview_reuse.translated("2") is None
+    assert preview_reuse.match("1", json_data) == (None, [])
+    assert preview_reuse.match("4", json_data) == (None, partial_matches)
+    # the revision of the matched document was not logged
+    assert preview_reuse.match("3", json_data) is None
+
+    # a document sharing the matching keys was imported meanwhile
+    preview_reuse.invalidate(document_matching_keys(json_data))
+    assert preview_reuse.match("1", json_data) is None
+    assert preview_reuse.translated("1") == json_data
+
+    preview_reuse = PreviewReuse(preview_log, reuse_matches=False)
+    assert preview_reuse.match("1", json_data) is None
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer local similarity matching."""
+
+from cds_ils.importer.similarity import SimilarityIndex
+
+
+def _document(pid, title, *authors):
+    """Return a document with its title and authors."""
+    return dict(
+        pid=pid, title=title, authors=[{"full_name": author} for author in authors]
+    )
+
+
+def test_similarity_index():
+    """Test that similar titles sharing an author are found, best first."""
+    index = SimilarityIndex(threshold=0.6)
+    index.add(_document("1", "Introduction to Quantum Mechanics", "Griffiths, David"))
+    index.add(_document("2", "Introduction to Quantum Mechanic", "Griffiths, D."))
+    index.add(_document("3", "Introduction to Quantum Mechanics", "Sakurai, J. J."))
+    index.add(_document("4", "Classical Electrodynamics", "Jackson, John David"))
+
+    matches = index.search("Introduction to quantum mechanics!", ["David Griffiths"])
+    assert [match.pid for match in matches] == ["1", "2"]
+    assert matches[0].score == 1
+    assert matches[1].score < 1
+
+    matches = index.search("Introduction to Quantum Mechanics", ["Griffiths"], 1)
+    assert [match.pid for match in matches] == ["1"]
+    # no limit, as configured with CDS_ILS_IMPORTER_FUZZY_MATCH_MAX_HITS = 0
+    matches = index.search("Introduction to Quantum Mechanics", ["Griffiths"], 0)
+    assert [match.pid for match in matches] == ["1", "2"]
+    assert index.search("Introduction to Quantum Mechanics", []) == []
+    assert index.search("Statistical Physics", ["Griffiths"]) == []
+
+    # kept up to date with the imported documents
+    index.remove(_document("1", "Introduction to Quantum Mechanics"))
+    index.add(_document("2", "Classical Mechanics", "Griffiths, D."))
+    assert index.search("Introduction to Quantum Mechanics", ["Griffiths"]) == []
+    assert len(index) == 3
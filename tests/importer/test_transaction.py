@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test importer batched transactions."""
+
+import pytest
+
+from cds_ils.importer.transaction import (
+    after_commit,
+    batched_transaction,
+    commit_batch,
+    record_savepoint,
+)
+
+
+def test_after_commit(app, db):
+    """Test that the commit callbacks run once the batch is committed."""
+    calls = []
+    after_commit(lambda: calls.append("not batched"))
+    assert calls == ["not batched"]
+
+    with batched_transaction(2):
+        with record_savepoint():
+            after_commit(lambda: calls.append("committed"))
+        with pytest.raises(ValueError):
+            with record_savepoint():
+                after_commit(lambda: calls.append("rolled back"))
+                raise ValueError("invalid record")
+        assert calls == ["not batched"]
+        commit_batch()
+    assert calls == ["not batched", "committed"]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 CERN.
+#
+# CDS-ILS is free software; you can redistribute it and/or modify it under
+# the terms of the MIT License; see LICENSE file for more details.
+
+"""Test CDS rules values mapping."""
+
+import pytest
+
+from cds_ils.importer.errors import UnexpectedValue
+from cds_ils.importer.providers.cds.rules.values_mapping import (
+    COMPILED_MAPPINGS,
+    mapping,
+)
+
+from .benchmark_values_mapping import MISSING_VALUE, collect_maps, linear_mapping
+
+
+def test_mapping_tables_match_linear_scan():
+    """Test that the lookup tables map the values as the maps."""
+    for field_map, values in collect_maps().values():
+        assert id(field_map) in COMPILED_MAPPINGS
+        for value in values:
+            for val in (value, " {} ".format(value), value.lower(), value.upper()):
+                assert mapping(field_map, val) == linear_mapping(field_map, val)
+                assert mapping(field_map, val, default_val="x") == linear_mapping(
+                    field_map, val, default_val="x"
+                )
+
+        with pytest.raises(UnexpectedValue):
+            mapping(field_map, MISSING_VALUE, raise_exception=True)
+
+
+def test_mapping_not_compiled_map():
+    """Test that maps not compiled are scanned."""
+    providers = {"safari": "SAF", "springer": "SPR"}
+    assert mapping(providers, "sa") == "safari"
+    assert mapping(providers, "EBL", default_val="EBL") == "EBL"
+    assert mapping(["a", "b"], "b") == "b"
+    assert mapping(["a", "b"], "c") is None
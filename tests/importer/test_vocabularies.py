@@ -3,7 +3,11 @@ from copy import deepcopy
 import pytest
 from invenio_app_ils.errors import VocabularyError
 
-from cds_ils.importer.vocabularies_validator import Validator
+from cds_ils.importer.vocabularies_validator import (
+    VOCABULARIES_TYPE_FILENAME,
+    Validator,
+    vocabulary_registry,
+)
 
 VOCABULARIES_FIELDS = {
     "field1": {
@@ -54,6 +58,13 @@ RECORD = {
     ],
 }
 
+JSON_VOCABULARIES_KEYS = [
+    "FIELD1_VALID_KEY",
+    "SUBFIELD2_VALID_KEY",
+    "SUBFIELD3_VALID_KEY_1",
+    "SUBFIELD3_VALID_KEY_2",
+]
+
 
 def test_validator(mocker):
     """Vocabulary validator tests."""
@@ -66,11 +77,11 @@ def test_validator(mocker):
 
     def test_all_valid():
         """Test that will not raise when all values are valid."""
-        # return the same keys as the one validated to fake that the
-        # vocabularies contain such values
+        # return the keys validated to fake that the vocabularies contain
+        # such values
         mocker.patch(
             "cds_ils.importer.vocabularies_validator.json_fetcher",
-            side_effect=lambda vocab_type, key: [key],
+            side_effect=lambda vocab_type: JSON_VOCABULARIES_KEYS,
         )
         mocker.patch(
             "cds_ils.importer.vocabularies_validator.es_fetcher",
@@ -93,7 +104,7 @@ def test_validator(mocker):
         """Test that will raise when type is invalid."""
         mocker.patch(
             "cds_ils.importer.vocabularies_validator.json_fetcher",
-            side_effect=lambda vocab_type, key: _raise(KeyError),
+            side_effect=lambda vocab_type: _raise(KeyError),
         )
         with pytest.raises(KeyError):
             validator.validate(VOCABULARIES_FIELDS, RECORD)
@@ -102,7 +113,7 @@ def test_validator(mocker):
         """Test that will raise when source file does not exist."""
         mocker.patch(
             "cds_ils.importer.vocabularies_validator.json_fetcher",
-            side_effect=lambda vocab_type, key: _raise(FileNotFoundError),
+            side_effect=lambda vocab_type: _raise(FileNotFoundError),
         )
         with pytest.raises(FileNotFoundError):
             validator.validate(VOCABULARIES_FIELDS, RECORD)
@@ -112,7 +123,7 @@ def test_validator(mocker):
         # key not found in JSON files
         mocker.patch(
             "cds_ils.importer.vocabularies_validator.json_fetcher",
-            side_effect=lambda vocab_type, key: [],
+            side_effect=lambda vocab_type: [],
         )
         with pytest.raises(VocabularyError):
             validator.validate(VOCABULARIES_FIELDS, RECORD)
@@ -139,4 +150,63 @@ def test_validator(mocker):
     for test in tests:
         test()
         validator.reset()
+        vocabulary_registry.clear()
         mocker.resetall()
+
+
+def test_validator_caches(mocker):
+    """Test that vocabularies are fetched once, including the misses."""
+    validator = Validator()
+    validator.reset()
+    json_fetcher = mocker.patch(
+        "cds_ils.importer.vocabularies_validator.json_fetcher",
+        side_effect=lambda vocab_type: JSON_VOCABULARIES_KEYS,
+    )
+    es_fetcher = mocker.patch(
+        "cds_ils.importer.vocabularies_validator.es_fetcher",
+        side_effect=lambda vocab_type, key: key if key == "FIELD4_VALID_KEY" else None,
+    )
+    es_batch_fetcher = mocker.patch(
+        "cds_ils.importer.vocabularies_validator.es_batch_fetcher",
+        side_effect=lambda vocab_type, keys: {"FIELD4_VALID_KEY"} & keys,
+    )
+
+    records = [dict(RECORD, field4="FIELD4_KEY_{}".format(i)) for i in range(10)]
+    records.append(RECORD)
+    with pytest.raises(VocabularyError):
+        validator.validate_many(VOCABULARIES_FIELDS, records)
+    assert json_fetcher.call_count == 3
+    # the search engine values are searched in a single query
+    es_batch_fetcher.assert_called_once_with(
+        "license", {"FIELD4_VALID_KEY"} | {"FIELD4_KEY_{}".format(i) for i in range(10)}
+    )
+    assert es_fetcher.call_count == 0
+
+    # found and not found values are cached
+    validator.validate(VOCABULARIES_FIELDS, RECORD)
+    for field, value in (("field1", "INVALID_KEY"), ("field4", "FIELD4_KEY_1")):
+        for _ in range(3):
+            with pytest.raises(VocabularyError):
+                validator.validate({field: VOCABULARIES_FIELDS[field]}, {field: value})
+    assert json_fetcher.call_count == 3
+    assert es_fetcher.call_count == 0
+
+    # expired values are searched again
+    validator.CACHE_TTL = -1
+    validator.reset()
+    validator.validate(VOCABULARIES_FIELDS, RECORD)
+    validator.validate(VOCABULARIES_FIELDS, RECORD)
+    assert es_fetcher.call_count == 2
+
+    # the vocabularies files are not read again after a reset
+    assert json_fetcher.call_count == 3
+    vocabulary_registry.clear()
+
+
+def test_vocabulary_registry_load():
+    """Test that all the vocabularies files are loaded at once."""
+    vocabulary_registry.clear()
+    vocabulary_registry.load()
+    assert set(vocabulary_registry.vocabularies) == set(VOCABULARIES_TYPE_FILENAME)
+    assert all(vocabulary_registry.vocabularies.values())
+    vocabulary_registry.clear()
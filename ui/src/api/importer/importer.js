@@ -10,8 +10,10 @@ const createTask = async (formData) => {
   return await http.post(`${importerURL}`, formData, headers);
 };
 
-const check = async (taskId, nextEntry = 0) => {
-  return await http.get(`${importerURL}/${taskId}/offset/${nextEntry}`);
+const check = async (taskId, cursor = 0) => {
+  return await http.get(`${importerURL}/${taskId}/records`, {
+    params: { after: cursor, full: true },
+  });
 };
 
 const list = async () => {
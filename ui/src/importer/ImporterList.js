@@ -67,6 +67,11 @@ export class ImporterList extends Component {
         field: "entries_count",
         formatter: this.optionalFormatter,
       },
+      {
+        title: "Summary",
+        field: "records_count",
+        formatter: this.summaryFormatter,
+      },
       { title: "Provider", field: "provider", formatter: this.labelFormatter },
       {
         title: "Mode",
@@ -167,6 +172,30 @@ export class ImporterList extends Component {
     return value != null ? value : "";
   };
 
+  summaryFormatter = ({ row }) => {
+    const counters = [
+      ["created_count", "green", "created"],
+      ["updated_count", "blue", "updated"],
+      ["deleted_count", "red", "deleted"],
+      ["unchanged_count", "grey", "unchanged"],
+      ["error_count", "red", "errors"],
+      ["partial_matches_count", "yellow", "partial matches"],
+    ];
+    return counters
+      .filter(([field]) => row[field] > 0)
+      .map(([field, color, title]) => (
+        <Popup
+          key={field}
+          content={title}
+          trigger={
+            <Label color={color} basic size="small">
+              {row[field]}
+            </Label>
+          }
+        />
+      ));
+  };
+
   trimFormatter = ({ col, row }) => {
     const value = row[col.field];
     return value != null ? (
@@ -71,7 +71,7 @@ export class ImportedDocuments extends React.Component {
     const records = data.records;
     const newRecords = records.slice(this.lastIndex, records.length);
 
-    stats.records.value = `${data.loaded_entries}/${data.entries_count}`;
+    stats.records.value = `${data.processed_count}/${data.entries_count}`;
 
     data.mode.includes("DELETE")
       ? delete stats.records_created
@@ -154,7 +154,8 @@ export class ImportedDocuments extends React.Component {
 
     const errorWhileFetching = !_isEmpty(data) && data?.status === "FAILED";
     const entriesReady =
-      (data?.loaded_entries || data?.loaded_entries === 0) && data?.entries_count;
+      (data?.processed_count || data?.processed_count === 0) &&
+      data?.entries_count;
 
     if (error) {
       const {
@@ -16,7 +16,7 @@ export class ImporterTaskDetails extends React.Component {
 
     this.importCompleted = false;
     this.requestBeingSent = false;
-    this.lastEntry = 0;
+    this.cursor = 0;
   }
 
   componentDidMount() {
@@ -54,13 +54,14 @@ export class ImporterTaskDetails extends React.Component {
       this.requestBeingSent = true;
 
       this.cancellableTaskDetailsFetch = withCancel(
-        importerApi.check(taskId, this.lastEntry)
+        importerApi.check(taskId, this.cursor)
       );
 
       const { data } = await this.cancellableTaskDetailsFetch.promise;
 
-      this.importCompleted = data.status !== "RUNNING";
-      this.lastEntry = data.loaded_entries;
+      // the remaining pages are loaded by the next checks
+      this.importCompleted = data.status !== "RUNNING" && !data.has_more;
+      this.cursor = data.next_cursor;
 
       this.setState((state) => ({
         isLoading: data.status === "RUNNING",